@@ -0,0 +1,64 @@
+"""
+Visualization of the robotic arm's link positions.
+
+matplotlib is only imported when a plotting function is called, so the IK solver and the
+motion control code stay headless and fast to import.
+
+1. show_arm: draws one arm configuration in an interactive window (the original IK plot).
+2. render_trajectory: draws every pose of a planned trajectory into an image file,
+   without opening a window, so it can be used on the headless controller after the fact.
+"""
+
+import inverse_kinematics_calculations as iv
+
+LINK_STYLES = [("link1", 'orange'), ("link2", 'blue'), ("link3", 'green')]
+POINT_NAMES = ["origin", "point1", "point2", "point3"]
+
+# Draw the arm reaching (X, Y) on a matplotlib Axes
+def plot_arm(ax, X, Y, annotate=True, alpha=1.0):
+    points = iv.link_positions(X, Y)
+    if annotate:
+        for name, point in zip(POINT_NAMES, points):
+            ax.annotate(name, point)
+    for i, (label, color) in enumerate(LINK_STYLES):
+        (x_a, y_a), (x_b, y_b) = points[i], points[i + 1]
+        ax.plot([x_a, x_b], [y_a, y_b], label=label, color=color, linestyle='solid', alpha=alpha)
+
+# Apply the axis limits, grid and labels of the original simulation plot
+def setup_axes(ax, title='Simulation'):
+    ax.set_title(title)
+    ax.grid(linestyle='solid', color='gray')
+    ax.set_xlim(-8.6, 40)
+    ax.set_ylim(-50, 50)
+    ax.set_xlabel('X Axis', fontsize=15)
+    ax.set_ylabel('Y Axis', fontsize=15)
+
+# Show one arm configuration in a blocking window
+def show_arm(X, Y):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    plot_arm(ax, X, Y)
+    setup_axes(ax)
+    plt.show()
+
+"""
+    Render a whole planned trajectory to an image file.
+
+    :param targets: sequence of (X, Y) targets in the arm plane
+    :param file_path: output image path, format taken from the extension
+    :param title: plot title
+"""
+def render_trajectory(targets, file_path, title='Trajectory'):
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    ax = fig.subplots()
+    targets = list(targets)
+    for i, (X, Y) in enumerate(targets):
+        # Later poses are drawn more opaque so the direction of motion is visible
+        alpha = 0.3 + 0.7 * (i + 1) / len(targets)
+        plot_arm(ax, X, Y, annotate=False, alpha=alpha)
+    setup_axes(ax, title)
+    fig.savefig(file_path)
+    return file_path
@@ -0,0 +1,276 @@
+"""
+Benchmark harness for the pick-cycle computations.
+
+Times the hot paths on synthetic but reproducible inputs (seeded random generator):
+
+    inverse_kinematics        : calculate_all_angles per target, and the batch solver
+    convert_angle_to_pwm      : PWM calibration per angle (the path of motor_movement_control.convert_angle_to_pwm),
+                                per motor batch, and all four joints at once
+    coordinate_conversion     : read a label_coordinate.txt file, convert every detection, schedule the picks
+    plan_pick_sequence        : full travel-optimized sequence planning over random reachable targets
+    frame_grabber             : frames delivered by FrameGrabber from recorded (or synthetic) frames
+
+Each benchmark runs at several batch sizes; the results are written as JSON so runs on different
+commits can be compared:
+
+    python benchmark.py -o before.json
+    python benchmark.py -o after.json --compare before.json
+"""
+
+import os
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+import inverse_kinematics_calculations as iv
+import pwm_calibration as pwm
+import detection_batch as db
+import coordinate_conversion as cc
+import plane_calibration as pc
+import target_scheduler as ts
+import pick_sequence as ps
+
+DEFAULT_SIZES = (1, 10, 100, 1000)
+PLAN_SIZES = (1, 5, 10, 20)
+FRAME_COUNTS = (10, 100)
+DEFAULT_REPEAT = 5
+DEFAULT_SEED = 0
+
+CLASS_NAMES = ('PURPLE', 'PINK', 'BLUE', 'GREEN')
+# Approximate box sides in YOLOv5 pixels of each class (2.85, 5.8, 5.8 and 8.7 cm bricks)
+CLASS_SIZES = (28, 58, 58, 87)
+
+# Table area the arm can reach, in robot coordinates (cm)
+TARGET_X_RANGE = (5.0, 40.0)
+TARGET_Z_RANGE = (-30.0, 30.0)
+
+# Random detection batch spread over the camera image
+def synthetic_detections(rng, n, width=640, height=480):
+    class_ids = rng.integers(0, len(CLASS_NAMES), n)
+    sides = np.array(CLASS_SIZES, dtype=float)[class_ids]
+    long_side = sides * rng.uniform(0.95, 1.05, n)
+    short_side = np.minimum(long_side, 28 * rng.uniform(0.95, 1.05, n))
+    rotated = rng.random(n) < 0.5
+    w = np.where(rotated, short_side, long_side)
+    h = np.where(rotated, long_side, short_side)
+    cx = rng.uniform(w / 2, width - w / 2)
+    cy = rng.uniform(h / 2, height - h / 2)
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=-1)
+    return db.make_detections([CLASS_NAMES[c] for c in class_ids], class_ids, boxes, rng.uniform(0.5, 1.0, n))
+
+# Random targets (coordinate_conversion.TARGET_DTYPE) that the arm can reach on the table
+def reachable_targets(rng, n, table_y=ts.TABLE_Y):
+    X = np.empty(0)
+    Z = np.empty(0)
+    while len(X) < n:
+        x = rng.uniform(*TARGET_X_RANGE, 4 * n)
+        z = rng.uniform(*TARGET_Z_RANGE, 4 * n)
+        angles, reachable = iv.calculate_all_angles_batch(x, table_y, z)
+        _, in_range = pwm.default_calibration.joint_angles_to_pwm(angles)
+        ok = reachable & in_range
+        X = np.concatenate([X, x[ok]])
+        Z = np.concatenate([Z, z[ok]])
+    targets = np.zeros(n, dtype=cc.TARGET_DTYPE)
+    targets['class_id'] = rng.integers(0, len(CLASS_NAMES), n)
+    targets['name'] = [CLASS_NAMES[c] for c in targets['class_id']]
+    targets['robot_x'] = X[:n]
+    targets['robot_z'] = Z[:n]
+    return targets
+
+# Recorded frames from a video file, or random frames when no file is given
+def recorded_frames(rng, n, file_path=None, width=640, height=480):
+    if file_path is None:
+        return [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(n)]
+    import cv2
+    cap = cv2.VideoCapture(file_path)
+    frames = []
+    while len(frames) < n:
+        ok, frame = cap.read()
+        if not ok:
+            if not frames:
+                raise ValueError(f"No frames in {file_path}")
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            continue
+        frames.append(frame)
+    cap.release()
+    return frames
+
+class FrameSource:
+    """cv2.VideoCapture-like source playing a list of frames once."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.position = 0
+
+    def read(self):
+        if self.position >= len(self.frames):
+            return False, None
+        frame = self.frames[self.position]
+        self.position += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+# Best, median and mean wall time (s) of function() over repeat runs, after one warm-up run
+def measure(function, repeat=DEFAULT_REPEAT):
+    function()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    times = np.array(times)
+    return {'best': float(times.min()), 'median': float(np.median(times)), 'mean': float(times.mean())}
+
+def bench_inverse_kinematics(rng, size, **_):
+    targets = reachable_targets(rng, size)
+    X, Z = targets['robot_x'], targets['robot_z']
+
+    def scalar():
+        for x, z in zip(X.tolist(), Z.tolist()):
+            iv.calculate_all_angles(x, ts.TABLE_Y, z)
+
+    def batch():
+        iv.calculate_all_angles_batch(X, ts.TABLE_Y, Z)
+
+    return {'inverse_kinematics': scalar, 'inverse_kinematics_batch': batch}
+
+# Calls the calibration directly: importing motor_movement_control opens the command log and the servo port
+def bench_convert_angle_to_pwm(rng, size, **_):
+    angles = {motor: rng.uniform(0, 180, size) for motor in (0, 2, 3, 5)}
+    for motor in (3, 5):
+        angles[motor] = rng.uniform(45, 180, size)
+    calibration = pwm.default_calibration
+
+    def scalar():
+        for motor, values in angles.items():
+            for angle in values.tolist():
+                calibration.angle_to_pwm_scalar(motor, angle)
+
+    def batch():
+        for motor, values in angles.items():
+            calibration.angle_to_pwm(motor, values)
+
+    joints = np.stack([angles[motor] for motor in (0, 2, 3, 5)], axis=-1)
+    return {'convert_angle_to_pwm': scalar, 'convert_angle_to_pwm_batch': batch,
+            'joint_angles_to_pwm': lambda: calibration.joint_angles_to_pwm(joints)}
+
+def bench_coordinate_conversion(rng, size, workdir=None, **_):
+    file_path = os.path.join(workdir, f'label_coordinate_{size}.txt')
+    db.write_label_file(synthetic_detections(rng, size), file_path)
+    calibration = pc.PlaneCalibration()
+
+    def pipeline():
+        targets = cc.convert_detections(db.load_label_file(file_path), calibration)
+        ts.schedule_targets(targets)
+
+    return {'coordinate_conversion': pipeline}
+
+def bench_plan_pick_sequence(rng, size, **_):
+    targets = reachable_targets(rng, size)
+    return {'plan_pick_sequence': lambda: ps.plan_pick_sequence(targets)}
+
+def bench_frame_grabber(rng, size, frames_path=None, **_):
+    import camera_capture
+    frames = recorded_frames(rng, size, frames_path)
+    height, width = frames[0].shape[:2]
+
+    def grab():
+        grabber = camera_capture.FrameGrabber(FrameSource(frames), width=width, height=height, loop=False)
+        grabber.start()
+        last = -1
+        while True:
+            frame, frame_id, _ = grabber.wait_for_frame(last, timeout=0.05)
+            if frame is None:
+                if not grabber.running:
+                    break
+                continue
+            last = frame_id
+        grabber.stop()
+
+    return {'frame_grabber': grab}
+
+# name: (benchmark function, batch sizes)
+BENCHMARKS = {
+    'inverse_kinematics': (bench_inverse_kinematics, DEFAULT_SIZES),
+    'convert_angle_to_pwm': (bench_convert_angle_to_pwm, DEFAULT_SIZES),
+    'coordinate_conversion': (bench_coordinate_conversion, DEFAULT_SIZES),
+    'plan_pick_sequence': (bench_plan_pick_sequence, PLAN_SIZES),
+    'frame_grabber': (bench_frame_grabber, FRAME_COUNTS),
+}
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+"""
+    Run the selected benchmarks.
+
+    :param names: keys of BENCHMARKS, all of them when omitted
+    :param sizes: batch sizes overriding each benchmark's defaults
+    :param repeat: timed runs per case
+    :param seed: random seed of the synthetic inputs
+    :param frames_path: video file with recorded frames for frame_grabber
+    :return: dict with the run's metadata and one result per benchmark case
+"""
+def run_benchmarks(names=None, sizes=None, repeat=DEFAULT_REPEAT, seed=DEFAULT_SEED, frames_path=None):
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in names or BENCHMARKS:
+            function, default_sizes = BENCHMARKS[name]
+            for size in sizes or default_sizes:
+                rng = np.random.default_rng(seed)
+                cases = function(rng, size, workdir=workdir, frames_path=frames_path)
+                for case, run in cases.items():
+                    timing = measure(run, repeat)
+                    timing.update(name=case, size=size, repeat=repeat, per_item=timing['median'] / size)
+                    results.append(timing)
+                    print(f"{case:<28} {size:>6}  median {timing['median'] * 1e3:10.3f} ms  "
+                          f"per item {timing['per_item'] * 1e6:10.2f} us")
+    return {
+        'meta': {
+            'revision': git_revision(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+# Print the median time of every case relative to a baseline result file
+def compare(report, baseline):
+    previous = {(r['name'], r['size']): r for r in baseline['results']}
+    print(f"\nCompared with {baseline['meta'].get('revision')} (ratio < 1 is faster)")
+    for result in report['results']:
+        old = previous.get((result['name'], result['size']))
+        if old is not None:
+            print(f"{result['name']:<28} {result['size']:>6}  {result['median'] / old['median']:6.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pick-cycle computations")
+    parser.add_argument('-o', '--output', default='benchmark.json', help="JSON result file")
+    parser.add_argument('-b', '--benchmark', action='append', choices=list(BENCHMARKS),
+                        help="benchmark to run, may be repeated (default: all)")
+    parser.add_argument('-s', '--sizes', type=int, nargs='+', help="batch sizes (default: per benchmark)")
+    parser.add_argument('-r', '--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--frames', help="video file with recorded frames")
+    parser.add_argument('--compare', help="earlier JSON result file to compare with")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.benchmark, args.sizes, args.repeat, args.seed, args.frames)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(report, json.load(f))
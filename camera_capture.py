@@ -10,44 +10,325 @@ Usage:
 4. Press 's' to capture an image.
 
 Note: Check the camera index if the feed is not accessible.
+
+FrameGrabber keeps reading frames on a background thread into a ring buffer of preallocated
+NumPy frames, so consumers get the newest frame directly from memory instead of reloading a JPEG.
+It also accepts a video/image file path or any object with a cv2.VideoCapture-like read(),
+so it can be used without a camera. An image file is read once and served as every frame
+(only once when loop is off); set frame_rate to throttle it.
+
+CameraManager probes camera backends and indices once, caches the working configuration in
+camera_cache.json and reopens directly from it on later starts. It keeps one warm grabber open
+across detection cycles and records the init and first-frame latency in its metrics.
 """
 
 import os
 import cv2
+import json
 import time
+import threading
+import numpy as np
+import instrumentation as it
 
 # Set environment variable for OpenCV
 os.environ["OPENCV_VIDEOIO_MSMF_ENABLE_HW_TRANSFORMS"] = "0"
 
-def capture_image(cap):
+# File extensions opened with cv2.imread instead of cv2.VideoCapture
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+class StillImage:
+    """cv2.VideoCapture-like source serving one image file, repeatedly when loop is set."""
+
+    def __init__(self, file_path, loop=True):
+        self.image = cv2.imread(file_path)
+        if self.image is None:
+            raise IOError(f"Could not read image {file_path!r}")
+        self.loop = loop
+        self.served = False
+
+    def read(self):
+        if self.served and not self.loop:
+            return False, None
+        self.served = True
+        return True, self.image
+
+    def release(self):
+        pass
+
+class FrameGrabber:
+    """Background frame grabber with a fixed-size ring buffer of frames."""
+
+    def __init__(self, source=1, backend=None, buffer_size=4, width=640, height=480, loop=True, frame_rate=None):
+        if buffer_size < 2:
+            raise ValueError("buffer_size must be at least 2")
+        self.source = source
+        self.backend = backend
+        self.buffer_size = buffer_size
+        self.width = width
+        self.height = height
+        self.loop = loop                # restart file sources at the end
+        self.frame_rate = frame_rate    # throttle reads, e.g. to replay a video at its own speed
+        self.cap = None
+        self.error = None
+
+        self._frames = None
+        self._ids = np.full(buffer_size, -1, dtype=np.int64)
+        self._stamps = np.zeros(buffer_size)
+        self._latest = -1               # slot of the newest frame
+        self._count = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    # Open the source: a camera index, a video/image path, or a capture-like object
+    def open(self):
+        if isinstance(self.source, str) and os.path.splitext(self.source)[1].lower() in IMAGE_EXTENSIONS:
+            self.cap = StillImage(self.source, self.loop)
+        elif isinstance(self.source, (int, str)):
+            if self.backend is None:
+                self.cap = cv2.VideoCapture(self.source)
+            else:
+                self.cap = cv2.VideoCapture(self.source, self.backend)
+            if not self.cap.isOpened():
+                raise IOError(f"Could not open video source {self.source!r}")
+            if isinstance(self.source, int):
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        else:
+            self.cap = self.source
+        return self.cap
+
+    def start(self):
+        if self._running:
+            return self
+        if self.cap is None:
+            self.open()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='FrameGrabber', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._cond:
+            self._cond.notify_all()
+        if self.cap is not None and self.cap is not self.source and hasattr(self.cap, 'release'):
+            self.cap.release()
+        self.cap = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _read(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop and isinstance(self.source, str):
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def _run(self):
+        period = 1.0 / self.frame_rate if self.frame_rate else 0.0
+        next_time = time.monotonic()
+        try:
+            while self._running:
+                ret, frame = self._read()
+                if not ret:
+                    self.error = "Failed to read frame."
+                    break
+                if self._frames is None or self._frames.shape[1:] != frame.shape:
+                    self._frames = np.empty((self.buffer_size,) + frame.shape, dtype=frame.dtype)
+
+                # Write into the slot after the newest one; readers keep using the newest slot meanwhile
+                slot = (self._latest + 1) % self.buffer_size
+                np.copyto(self._frames[slot], frame)
+                with self._cond:
+                    self._ids[slot] = self._count
+                    self._stamps[slot] = time.monotonic()
+                    self._latest = slot
+                    self._count += 1
+                    self._cond.notify_all()
+
+                if period:
+                    next_time += period
+                    time.sleep(max(0.0, next_time - time.monotonic()))
+        finally:
+            self._running = False
+            with self._cond:
+                self._cond.notify_all()
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def frame_count(self):
+        return self._count
+
+    """
+        Return the newest frame as (frame, frame_id, timestamp).
+
+        The frame is a view into the ring buffer (no copy); it stays valid until
+        buffer_size - 1 newer frames have been grabbed. Pass copy=True to keep it longer.
+        Returns (None, -1, None) before the first frame.
+    """
+    def latest(self, copy=False):
+        with self._cond:
+            slot = self._latest
+            if slot < 0:
+                return None, -1, None
+            frame_id, stamp = int(self._ids[slot]), float(self._stamps[slot])
+        frame = self._frames[slot]
+        return (frame.copy() if copy else frame), frame_id, stamp
+
+    # Block until a frame newer than after_id is available, then return it like latest()
+    def wait_for_frame(self, after_id=-1, timeout=None, copy=False):
+        with self._cond:
+            ready = self._cond.wait_for(lambda: self._count - 1 > after_id or not self._running, timeout)
+            if not ready or self._count - 1 <= after_id:
+                return None, -1, None
+        return self.latest(copy)
+
+CAMERA_CACHE_PATH = 'camera_cache.json'
+# Backends tried in order while probing; names missing from this OpenCV build are skipped
+DEFAULT_BACKENDS = ['CAP_DSHOW', 'CAP_MSMF', 'CAP_V4L2', 'CAP_ANY']
+DEFAULT_INDICES = [1, 0, 2, 3]
+
+class CameraManager:
+    """Opens the camera from a cached configuration and keeps a warm FrameGrabber."""
+
+    def __init__(self, cache_path=CAMERA_CACHE_PATH, indices=DEFAULT_INDICES, backends=DEFAULT_BACKENDS,
+                 width=640, height=480, buffer_size=4, first_frame_timeout=5.0):
+        self.cache_path = cache_path
+        self.indices = list(indices)
+        self.backends = list(backends)
+        self.width = width
+        self.height = height
+        self.buffer_size = buffer_size
+        self.first_frame_timeout = first_frame_timeout
+        self.config = None
+        self.grabber = None
+        self.metrics = {'from_cache': False, 'probe_time': None, 'init_time': None, 'first_frame_time': None}
+
+    def load_cache(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                config = json.load(f)
+            return {'index': int(config['index']), 'backend': str(config['backend'])}
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save_cache(self, config):
+        with open(self.cache_path, 'w') as f:
+            json.dump(config, f)
+
+    # Open a grabber for one configuration and check that it delivers a frame; None on failure
+    def _try_open(self, config):
+        backend = getattr(cv2, config['backend'], None)
+        if backend is None:
+            return None
+        grabber = FrameGrabber(config['index'], backend, self.buffer_size, self.width, self.height)
+        try:
+            cap = grabber.open()
+        except IOError:
+            return None
+        if not cap.read()[0]:
+            cap.release()
+            return None
+        return grabber
+
+    # Try every backend/index pair, cache and return the first one that works
+    def probe(self):
+        start = time.perf_counter()
+        for backend in self.backends:
+            for index in self.indices:
+                config = {'index': index, 'backend': backend}
+                grabber = self._try_open(config)
+                if grabber is not None:
+                    self.metrics['probe_time'] = time.perf_counter() - start
+                    self.save_cache(config)
+                    return config, grabber
+        self.metrics['probe_time'] = time.perf_counter() - start
+        raise IOError("Could not open video device.")
+
+    """
+        Return the warm, running FrameGrabber, opening it on the first call.
+
+        The cached configuration is tried first; the backends and indices are only probed
+        when there is no cache or the cached camera can no longer be opened.
+    """
+    def open(self):
+        if self.grabber is not None and self.grabber.running:
+            return self.grabber
+
+        start = time.perf_counter()
+        config = self.load_cache()
+        grabber = self._try_open(config) if config else None
+        self.metrics['from_cache'] = grabber is not None
+        if grabber is None:
+            config, grabber = self.probe()
+        self.metrics['init_time'] = time.perf_counter() - start
+
+        self.config = config
+        self.grabber = grabber.start()
+        frame, _, _ = self.grabber.wait_for_frame(timeout=self.first_frame_timeout)
+        self.metrics['first_frame_time'] = time.perf_counter() - start if frame is not None else None
+        return self.grabber
+
+    def close(self):
+        if self.grabber is not None:
+            self.grabber.stop()
+            self.grabber = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def capture_image(grabber, save_path='1000.jpg'):
     print("Press 's' to capture image")
+    frame_id = -1
     while True:
-        ret, frame = cap.read()
-        if not ret:
+        frame, frame_id, stamp = grabber.wait_for_frame(frame_id, timeout=1.0)
+        if frame is None:
             print("Error: Failed to read frame.")
-            break
+            return None
         cv2.imshow("Capture", frame)
         if cv2.waitKey(1) & 0xFF == ord('s'):
-            cv2.imwrite('1000.jpg', frame)
-            break
+            frame = frame.copy()
+            # Capture latency from the grab of the frame (monotonic stamp) to its delivery, not the wait for the key
+            end = it.tracer.clock()
+            it.tracer.record('capture', end - (time.monotonic() - stamp), end)
+            # The detector still reads the snapshot from disk; the frame itself stays in memory
+            if save_path:
+                cv2.imwrite(save_path, frame)
+            return frame
 
 def main():
-    start = time.time()
-
-    with cv2.VideoCapture(1, cv2.CAP_DSHOW) as cap:
-        if not cap.isOpened():
-            print("Error: Could not open video device.")
-            return
-        
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    try:
+        camera = CameraManager()
+        grabber = camera.open()
+    except IOError:
+        print("Error: Could not open video device.")
+        return
 
-        end = time.time()
-        print("Initialization time: %f seconds" % (end - start))
+    with camera:
+        print("Initialization time: %f seconds (cached configuration: %s)"
+              % (camera.metrics['init_time'], camera.metrics['from_cache']))
+        if camera.metrics['first_frame_time'] is not None:
+            print("First frame latency: %f seconds" % camera.metrics['first_frame_time'])
 
-        capture_image(cap)
+        img = capture_image(grabber)
 
-    img = cv2.imread("1000.jpg")
+    if img is None:
+        return
     cv2.imshow("Show", img)
     key = cv2.waitKey(0)
     if key == ord("q"):
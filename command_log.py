@@ -0,0 +1,192 @@
+"""
+Pluggable sinks for the PWM command log.
+
+Each record is the step order followed by the PWM value of the six motors, in the same layout
+write_pwm_to_file has always used ("order,m0,m2,m3,m5,m7,m4"). Records are collected in a
+preallocated in-memory buffer and written in batches: when the buffer is full, every
+flush_interval seconds (a daemon thread flushes pending records even when no more commands
+arrive), or on flush()/close().
+
+Sinks:
+    FileCommandSink   : CSV text or compact binary records (RECORD_DTYPE) at a configurable path
+    StdoutCommandSink : CSV lines on a text stream, sys.stdout by default
+    MemoryCommandSink : keeps every record in memory, for tests
+
+The default log path is pwm.txt in the working directory, overridable with PWM_LOG_PATH.
+read_log reads a CSV or binary log back, e.g. for replay.py.
+"""
+
+import os
+import abc
+import sys
+import time
+import threading
+import numpy as np
+
+NUM_CHANNELS = 6
+DEFAULT_LOG_PATH = os.environ.get('PWM_LOG_PATH', 'pwm.txt')
+DEFAULT_BUFFER_SIZE = 256
+DEFAULT_FLUSH_INTERVAL = 1.0    # seconds
+
+# On-disk layout of one binary record (28 bytes)
+RECORD_DTYPE = np.dtype([('order', '<u4'), ('pwm', '<f4', (NUM_CHANNELS,))])
+
+# Format a PWM value like the original str() output: 95 -> "95", 65.5 -> "65.5"
+def format_value(value):
+    value = float(value)
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+# One CSV line without the newline
+def format_record(order, pwm_values):
+    return ','.join([str(int(order))] + [format_value(v) for v in pwm_values])
+
+class CommandSink(abc.ABC):
+    """Base class of the PWM command sinks."""
+
+    @abc.abstractmethod
+    def write(self, order, pwm_values):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class BufferedCommandSink(CommandSink):
+    """Collects records in a preallocated buffer and hands them to _write_records in batches."""
+
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        if buffer_size < 1:
+            raise ValueError("buffer_size must be at least 1")
+        self.flush_interval = flush_interval
+        self._orders = np.zeros(buffer_size, dtype=np.int64)
+        self._pwm = np.zeros((buffer_size, NUM_CHANNELS), dtype=float)
+        self._count = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._timer = None
+
+    def write(self, order, pwm_values):
+        with self._lock:
+            self._orders[self._count] = order
+            self._pwm[self._count] = pwm_values
+            self._count += 1
+            due = self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval
+            if self._count == len(self._orders) or due:
+                self._flush_locked()
+            elif self._timer is None and self.flush_interval is not None and not self._closed.is_set():
+                # Started on the first buffered record, so unused sinks do not own a thread
+                self._timer = threading.Thread(target=self._flush_loop, name="command-log-flush", daemon=True)
+                self._timer.start()
+
+    # Flush pending records flush_interval seconds after the last flush, until the sink is closed
+    def _flush_loop(self):
+        timeout = self.flush_interval
+        while not self._closed.wait(timeout):
+            with self._lock:
+                elapsed = time.monotonic() - self._last_flush
+                if self._count and elapsed >= self.flush_interval:
+                    self._flush_locked()
+                    elapsed = 0.0
+                # Wake up when the pending records are due, not a full interval from now
+                timeout = self.flush_interval - elapsed if self._count else self.flush_interval
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self._closed.set()
+        if self._timer is not None:
+            self._timer.join()
+            self._timer = None
+        self.flush()
+
+    def _flush_locked(self):
+        if self._count:
+            self._write_records(self._orders[:self._count], self._pwm[:self._count])
+            self._count = 0
+        self._last_flush = time.monotonic()
+
+    @abc.abstractmethod
+    def _write_records(self, orders, pwm):
+        pass
+
+class FileCommandSink(BufferedCommandSink):
+    """Appends batches of records to a CSV ('csv') or binary ('binary') file."""
+
+    def __init__(self, path=DEFAULT_LOG_PATH, fmt='csv', buffer_size=DEFAULT_BUFFER_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        if fmt not in ('csv', 'binary'):
+            raise ValueError(f"Invalid format: {fmt}, expected 'csv' or 'binary'")
+        super().__init__(buffer_size, flush_interval)
+        self.path = path
+        self.fmt = fmt
+
+    def _write_records(self, orders, pwm):
+        if self.fmt == 'csv':
+            lines = [format_record(order, values) + '\n' for order, values in zip(orders, pwm)]
+            with open(self.path, 'a') as f:
+                f.writelines(lines)
+        else:
+            records = np.empty(len(orders), dtype=RECORD_DTYPE)
+            records['order'] = orders
+            records['pwm'] = pwm
+            with open(self.path, 'ab') as f:
+                f.write(records.tobytes())
+
+class StdoutCommandSink(BufferedCommandSink):
+    """Writes batches of CSV lines to a text stream."""
+
+    def __init__(self, stream=None, buffer_size=DEFAULT_BUFFER_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        super().__init__(buffer_size, flush_interval)
+        self.stream = stream
+
+    def _write_records(self, orders, pwm):
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.writelines(format_record(order, values) + '\n' for order, values in zip(orders, pwm))
+        stream.flush()
+
+class MemoryCommandSink(CommandSink):
+    """Keeps every record in memory; records is a list of (order, [pwm, ...]) tuples."""
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def write(self, order, pwm_values):
+        with self._lock:
+            self.records.append((int(order), [float(v) for v in pwm_values]))
+
+    def lines(self):
+        return [format_record(order, values) for order, values in self.records]
+
+# Read a command log back as step orders (N,) and PWM values (N, NUM_CHANNELS)
+# The format is detected from the content when fmt is omitted (binary records contain zero bytes)
+def read_log(path=DEFAULT_LOG_PATH, fmt=None):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if fmt is None:
+        fmt = 'binary' if b'\x00' in data else 'csv'
+    if fmt == 'binary':
+        if len(data) % RECORD_DTYPE.itemsize:
+            raise ValueError(f"{path} is not a binary command log")
+        records = np.frombuffer(data, dtype=RECORD_DTYPE)
+        return records['order'].astype(np.int64), records['pwm'].astype(float)
+    if fmt != 'csv':
+        raise ValueError(f"Invalid format: {fmt}, expected 'csv' or 'binary'")
+    rows = [line.split(',') for line in data.decode().splitlines() if line.strip()]
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, NUM_CHANNELS))
+    values = np.array(rows, dtype=float)
+    return values[:, 0].astype(np.int64), values[:, 1:]
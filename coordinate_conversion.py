@@ -1,32 +1,48 @@
 """ 
 Detects and normalizes LEGO brick coordinates for robotic arm manipulation.
 
-1. Reads the detected label number, name, and coordinates (YOLOv5 scale) of LEGO bricks 
-   from the detection results file.
+1. Takes the detected label number, name, and coordinates (YOLOv5 scale) of LEGO bricks 
+   as an in-memory detection batch (detection_batch.py), or reads them from the detection results file.
 
-2. Normalizes the YOLOv5 coordinates by dividing by 640 and scales them to real-world sizes (cm). 
-   Converts these values to the robot's coordinate system using the LEGO brick's center.
+2. Maps the YOLOv5 coordinates to real-world sizes (cm) and the robot's coordinate system using the 
+   LEGO brick's center and the persisted plane calibration (plane_calibration.py), in one matrix product.
 
-3. Allows the user to select the desired class ID for the robot to pick up.
+   Every detection is converted, any number of boxes per class and any number of classes.
+
+3. Selects the object for the robot to pick up automatically with a scheduling policy
+   (target_scheduler.py), or lets the user select it when run interactively.
 
 4. Displays the selected class name and its coordinates in the robot's coordinate system.
 """
 
 import numpy as np
+import detection_batch as db
+import plane_calibration as pc
+import target_scheduler as ts
+import instrumentation as it
 
 # Load recognized LEGO color categories and their positions in YOLOv5 from a txt file
 def load_results(file_path):
     with open(file_path, 'r') as f:
         return [line.strip().split(',') for line in f]
 
-# Convert recognition results to integers and organize them into a 2D list
+# Convert recognition results to integers and organize them into a 2D list, one slot per class
+# Only the last box of each class is kept; use convert_detections to keep every box
 def organize_results(result):
-    label_num_coord = [[0, 0, 0, 0] for _ in range(4)]
+    class_ids = [int(float(c)) for c in result[-1][:len(result) - 1]]
+    label_num_coord = [[0, 0, 0, 0] for _ in range(max(class_ids + [3]) + 1)]
     for i in range(len(result) - 1):
         index_num = int(float(result[-1][i]))
         label_num_coord[index_num] = [int(float(x)) if idx != 0 else x for idx, x in enumerate(result[i])]
     return label_num_coord
 
+# Arrange a detection batch into the same 2D list as organize_results, keeping sub-pixel coordinates
+def organize_detections(detections):
+    label_num_coord = [[0, 0, 0, 0] for _ in range(max(detections['class_id'].tolist() + [3]) + 1)]
+    for det in detections:
+        label_num_coord[int(det['class_id'])] = [str(det['name'])] + [float(det[key]) for key in ('x1', 'y1', 'x2', 'y2')]
+    return label_num_coord
+
 # Calculate side lengths and center coordinates
 def calculate_dimensions_and_center(label_num_coord):
     dimensions = []
@@ -43,6 +59,39 @@ def calculate_dimensions_and_center(label_num_coord):
             centers.append((None, None))
     return dimensions, centers
 
+# Detection fields followed by the box geometry (YOLOv5 pixels), table (cm) and robot coordinates
+TARGET_DTYPE = np.dtype(db.DETECTION_DTYPE.descr + [
+    ('center_x', '<f8'), ('center_y', '<f8'),
+    ('short_side', '<f8'), ('long_side', '<f8'),
+    ('real_x', '<f8'), ('real_y', '<f8'),
+    ('robot_x', '<f8'), ('robot_z', '<f8'),
+])
+
+"""
+    Compute centers, side lengths, real and robot coordinates for every detection in one pass.
+
+    :param detections: detection batch (detection_batch.DETECTION_DTYPE)
+    :param calibration: plane_calibration.PlaneCalibration, plane_calibration.default_calibration() when omitted
+    :return: structured array of TARGET_DTYPE, one row per detection
+"""
+@it.traced('conversion')
+def convert_detections(detections, calibration=None):
+    if calibration is None:
+        calibration = pc.default_calibration()
+
+    targets = np.zeros(len(detections), dtype=TARGET_DTYPE)
+    for field in db.DETECTION_DTYPE.names:
+        targets[field] = detections[field]
+
+    centers, short_side, long_side = db.box_geometry(detections)
+    real = calibration.to_real(centers)
+    robot = calibration.to_robot(centers)
+    targets['center_x'], targets['center_y'] = centers.T
+    targets['short_side'], targets['long_side'] = short_side, long_side
+    targets['real_x'], targets['real_y'] = real.T
+    targets['robot_x'], targets['robot_z'] = robot.T
+    return targets
+
 # Find the slope and intercept
 def find_linear_equation(len_x, len_y):
     slope, intercept = np.polyfit(len_x, len_y, 1)
@@ -57,56 +106,50 @@ def apply_linear_equation(x, slope, intercept):
     return x * slope + intercept
 
 # Main function
-def main():
-    result = load_results('label_coordinate.txt')
-    print("Recognition results:", result)
-
-    label_num_coord = organize_results(result)
-    print("Organized label coordinates:", label_num_coord)
-
-    # Calculate the side lengths and center for each LEGO
-    dimensions, centers = calculate_dimensions_and_center(label_num_coord)
+# detections: detection batch handed over by the detector; read from label_coordinate.txt when omitted
+# calibration: pixel => robot mapping; plane_calibration.json or the two-point model when omitted
+# policy: target_scheduler policy used to pick the object; interactive asks the user instead
+def main(detections=None, file_path='label_coordinate.txt', calibration=None, policy='nearest',
+         interactive=False, **options):
+    if detections is None:
+        detections = db.load_label_file(file_path)
+    if calibration is None:
+        calibration = pc.default_calibration()
+    print("Recognition results:", detections)
+
+    # Calculate the side lengths, center, real and robot coordinates of every LEGO
+    targets = convert_detections(detections, calibration)
 
     # Actual sizes of LEGO (in cm)
     real_sizes = [2.85, 5.8, 8.7]  # PURPLE, PINK & BLUE, GREEN
-    YOLO_X_list = [640, 0]
-    Real_X_list = [64.6, 0]
-    YOLO_Y_list = [640, 0]
-    Real_Y_list = [48.5, 0]
 
-    # Calculate slope and intercept
-    YOLO_X_Slope, YOLO_X_Intercept = find_linear_equation(YOLO_X_list, Real_X_list)
-    YOLO_Y_Slope, YOLO_Y_Intercept = find_linear_equation(YOLO_Y_list, Real_Y_list)
-
-    real_coords = []
-    for i in range(4):
-        if label_num_coord[i][0] != 0:
-            center_x, center_y = centers[i]
-            real_x = apply_linear_equation(center_x, YOLO_X_Slope, YOLO_X_Intercept)
-            real_y = apply_linear_equation(center_y, YOLO_Y_Slope, YOLO_Y_Intercept)
-            real_coords.append((real_x, real_y))
-            print(f"{label_num_coord[i][0]} Center coordinates: {real_coords[-1]}")
-        else:
-            real_coords.append((None, None))
+    for class_id, group in db.group_by_class(targets).items():
+        print(f"Class {class_id} ({group['name'][0]}): {len(group)} detected")
+    for i, target in enumerate(targets):
+        print(f"{i} {target['name']} Center coordinates: ({target['real_x']}, {target['real_y']})")
 
-    # Allow user to choose which object to capture
-    available_indices = [i for i in range(4) if label_num_coord[i][0] != 0]
-    for idx in available_indices:
-        print(f"{label_num_coord[idx][0]} : {label_num_coord[idx]}")
+    if not len(targets):
+        print("No objects detected.")
+        return None
 
-    if available_indices:
+    if interactive:
+        # Allow user to choose which object to capture
         index = int(input("Please enter the number of the object to be captured: "))
-        if index in available_indices:
-            coord = real_coords[index]
-            print(f"{label_num_coord[index][0]} : {coord}")
-            final_coord = (coord[1], real_to_robot_coord(coord[0]))
-            print(f"(X = {final_coord[0]}, Z = {final_coord[1]})")
-            return final_coord
-        else:
+        if not 0 <= index < len(targets):
             print("The entered number is incorrect.")
+            return None
     else:
-        print("No objects detected.")
+        index = ts.select_target(targets, policy, **options)
+        if index is None:
+            print("No reachable objects detected.")
+            return None
+
+    target = targets[index]
+    print(f"{target['name']} : ({target['real_x']}, {target['real_y']})")
+    final_coord = (float(target['robot_x']), float(target['robot_z']))
+    print(f"(X = {final_coord[0]}, Z = {final_coord[1]})")
+    return final_coord
     
 
 if __name__ == "__main__":
-    main()
+    main(interactive=True)
@@ -0,0 +1,105 @@
+"""
+In-memory batch of LEGO brick detections.
+
+A detection batch is a structured NumPy array with one row per bounding box (DETECTION_DTYPE).
+A detector hands it directly to coordinate_conversion.py, so no label_coordinate.txt round-trip
+is needed and box coordinates keep their sub-pixel precision.
+
+Adapters:
+    make_detections  : build a batch from names, class ids and boxes
+    from_xyxy        : YOLOv5 results (results.xyxy[0] rows: x1, y1, x2, y2, confidence, class)
+    from_rows        : rows parsed from the label_coordinate.txt format
+    load_label_file  : read label_coordinate.txt
+    write_label_file : write a batch back in the label_coordinate.txt format
+
+A batch may hold any number of boxes per class and any number of classes; box_geometry and
+group_by_class work on all of them at once.
+
+label_coordinate.txt format: one "name,x1,y1,x2,y2" line per box, followed by a last line
+with the class id of each box ("c0,c1,...").
+"""
+
+import numpy as np
+
+DETECTION_DTYPE = np.dtype([
+    ('name', 'U32'),
+    ('class_id', '<i4'),
+    ('x1', '<f8'),
+    ('y1', '<f8'),
+    ('x2', '<f8'),
+    ('y2', '<f8'),
+    ('confidence', '<f4'),
+])
+
+# Empty batch
+def empty_detections():
+    return np.zeros(0, dtype=DETECTION_DTYPE)
+
+"""
+    Build a detection batch.
+
+    :param names: class name of each box
+    :param class_ids: class id of each box
+    :param boxes: (N, 4) array of x1, y1, x2, y2 in YOLOv5 pixels
+    :param confidences: optional confidence of each box, 1.0 when omitted
+    :return: structured array of DETECTION_DTYPE
+"""
+def make_detections(names, class_ids, boxes, confidences=None):
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+    detections = np.zeros(len(boxes), dtype=DETECTION_DTYPE)
+    detections['name'] = names
+    detections['class_id'] = class_ids
+    detections['x1'], detections['y1'], detections['x2'], detections['y2'] = boxes.T
+    detections['confidence'] = 1.0 if confidences is None else confidences
+    return detections
+
+"""
+    Convert YOLOv5 results to a detection batch.
+
+    :param xyxy: (N, 6) array or tensor of x1, y1, x2, y2, confidence, class, e.g. results.xyxy[0]
+    :param names: class names indexed by class id (list or dict, e.g. model.names)
+    :return: structured array of DETECTION_DTYPE
+"""
+def from_xyxy(xyxy, names):
+    if hasattr(xyxy, 'cpu'):
+        xyxy = xyxy.cpu().numpy()
+    xyxy = np.asarray(xyxy, dtype=float).reshape(-1, 6)
+    class_ids = xyxy[:, 5].astype(int)
+    return make_detections([names[c] for c in class_ids], class_ids, xyxy[:, :4], xyxy[:, 4])
+
+# Convert rows parsed from label_coordinate.txt (the output of coordinate_conversion.load_results)
+def from_rows(rows):
+    rows = [row for row in rows if row and row != ['']]
+    if len(rows) < 2:
+        return empty_detections()
+    boxes = rows[:-1]
+    class_ids = [int(float(c)) for c in rows[-1][:len(boxes)]]
+    return make_detections([row[0] for row in boxes], class_ids, [[float(v) for v in row[1:5]] for row in boxes])
+
+# Read a detection batch from a label_coordinate.txt file
+def load_label_file(file_path):
+    with open(file_path, 'r') as f:
+        return from_rows([line.strip().split(',') for line in f])
+
+# Write a detection batch in the label_coordinate.txt format
+def write_label_file(detections, file_path):
+    with open(file_path, 'w') as f:
+        for det in detections:
+            box = [repr(float(det[key])) for key in ('x1', 'y1', 'x2', 'y2')]
+            f.write(','.join([str(det['name'])] + box) + '\n')
+        f.write(','.join(str(int(c)) for c in detections['class_id']) + '\n')
+
+# Centers (N, 2) and short and long side lengths (N,) of every box in a batch
+def box_geometry(detections):
+    width = detections['x2'] - detections['x1']
+    height = detections['y2'] - detections['y1']
+    centers = np.stack([(detections['x1'] + detections['x2']) / 2,
+                        (detections['y1'] + detections['y2']) / 2], axis=-1)
+    return centers, np.minimum(width, height), np.maximum(width, height)
+
+# Split a batch (or any structured array with a class_id field) into {class_id: rows}, keeping row order
+def group_by_class(detections):
+    class_ids = detections['class_id']
+    order = np.argsort(class_ids, kind='stable')
+    unique, starts = np.unique(class_ids[order], return_index=True)
+    return {int(c): detections[rows] for c, rows in zip(unique, np.split(order, starts[1:]))}
@@ -0,0 +1,201 @@
+"""
+Opt-in stage timing for the pick cycle.
+
+Stages are timed with a monotonic clock (time.perf_counter) into a preallocated ring buffer of
+SPAN_DTYPE records, so recording a span does not allocate. When the tracer is disabled, span()
+returns a shared no-op context and traced() calls straight through.
+
+    with instrumentation.span('ik'):
+        ...
+
+    @instrumentation.traced('gripper')
+    def gripper_action(...):
+
+stats() gives count, mean, p50, p95, p99 and max per stage (milliseconds), histogram() the duration
+distribution of one stage, and chrome_trace() a timeline in the Chrome trace event format
+(chrome://tracing or https://ui.perfetto.dev), one cycle or all of them.
+
+The default tracer is enabled with the environment variable PICK_TRACE=1.
+"""
+
+import os
+import json
+import time
+import threading
+import functools
+import contextlib
+import numpy as np
+
+DEFAULT_CAPACITY = 8192
+TRACE_PATH = 'pick_trace.json'
+PERCENTILES = (50, 95, 99)
+
+SPAN_DTYPE = np.dtype([
+    ('stage', '<i4'),
+    ('cycle', '<i8'),
+    ('thread', '<i8'),
+    ('start', '<f8'),      # seconds, time.perf_counter
+    ('end', '<f8'),
+])
+
+NULL_SPAN = contextlib.nullcontext()
+
+class _Span:
+    __slots__ = ('tracer', 'stage', 'cycle', 'start')
+
+    def __init__(self, tracer, stage, cycle):
+        self.tracer = tracer
+        self.stage = stage
+        self.cycle = cycle
+
+    def __enter__(self):
+        self.start = self.tracer.clock()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.record(self.stage, self.start, self.tracer.clock(), self.cycle)
+
+class Tracer:
+    """Ring buffer of stage spans; the oldest spans are overwritten when it is full."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, enabled=False, clock=time.perf_counter):
+        self.enabled = enabled
+        self.clock = clock
+        self.cycle = 0
+        self.stages = []
+        self._stage_ids = {}
+        self._spans = np.zeros(capacity, dtype=SPAN_DTYPE)
+        self._count = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def clear(self):
+        with self._lock:
+            self._count = 0
+            self.cycle = 0
+
+    # Start the next pick cycle; spans without an explicit cycle belong to the current one
+    def new_cycle(self):
+        with self._lock:
+            self.cycle += 1
+            return self.cycle
+
+    # Cycle of the calling thread's spans without an explicit cycle
+    def current_cycle(self):
+        cycle = getattr(self._local, 'cycle', None)
+        return self.cycle if cycle is None else cycle
+
+    # Record the calling thread's spans, including traced() ones, under cycle (e.g. a pipeline frame id)
+    @contextlib.contextmanager
+    def in_cycle(self, cycle):
+        previous = getattr(self._local, 'cycle', None)
+        self._local.cycle = cycle
+        try:
+            yield cycle
+        finally:
+            self._local.cycle = previous
+
+    def _stage_id(self, stage):
+        stage_id = self._stage_ids.get(stage)
+        if stage_id is None:
+            stage_id = self._stage_ids[stage] = len(self.stages)
+            self.stages.append(stage)
+        return stage_id
+
+    def record(self, stage, start, end, cycle=None):
+        if not self.enabled:
+            return
+        if cycle is None:
+            cycle = self.current_cycle()
+        with self._lock:
+            self._spans[self._count % len(self._spans)] = (self._stage_id(stage), cycle,
+                                                           threading.get_native_id(), start, end)
+            self._count += 1
+
+    def span(self, stage, cycle=None):
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, stage, cycle)
+
+    # Recorded spans, oldest first
+    def spans(self):
+        with self._lock:
+            capacity = len(self._spans)
+            if self._count <= capacity:
+                return self._spans[:self._count].copy()
+            split = self._count % capacity
+            return np.concatenate([self._spans[split:], self._spans[:split]])
+
+    def durations(self, stage):
+        spans = self.spans()
+        if stage not in self._stage_ids:
+            return np.empty(0)
+        spans = spans[spans['stage'] == self._stage_ids[stage]]
+        return spans['end'] - spans['start']
+
+    # {stage: {'count', 'mean', 'p50', 'p95', 'p99', 'max'}}, times in milliseconds
+    def stats(self):
+        result = {}
+        for stage in self.stages:
+            durations = self.durations(stage) * 1e3
+            if not len(durations):
+                continue
+            entry = {'count': len(durations), 'mean': float(durations.mean())}
+            for p, value in zip(PERCENTILES, np.percentile(durations, PERCENTILES)):
+                entry[f'p{p}'] = float(value)
+            entry['max'] = float(durations.max())
+            result[stage] = entry
+        return result
+
+    # Counts and bin edges (milliseconds) of one stage's durations
+    def histogram(self, stage, bins=20):
+        return np.histogram(self.durations(stage) * 1e3, bins=bins)
+
+    def print_stats(self):
+        print(f"{'stage':<16}{'count':>7}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)")
+        for stage, entry in self.stats().items():
+            print(f"{stage:<16}{entry['count']:>7}" + ''.join(f"{entry[key]:>10.3f}" for key in ('mean', 'p50', 'p95', 'p99', 'max')))
+
+    # Chrome trace event format: one complete ('X') event per span, timestamps in microseconds
+    def chrome_trace(self, cycle=None):
+        spans = self.spans()
+        if cycle is not None:
+            spans = spans[spans['cycle'] == cycle]
+        origin = float(spans['start'].min()) if len(spans) else 0.0
+        threads = {thread: i for i, thread in enumerate(dict.fromkeys(spans['thread'].tolist()))}
+        events = [{
+            'name': self.stages[stage],
+            'cat': 'pick',
+            'ph': 'X',
+            'ts': (start - origin) * 1e6,
+            'dur': (end - start) * 1e6,
+            'pid': os.getpid(),
+            'tid': threads[thread],
+            'args': {'cycle': span_cycle},
+        } for stage, span_cycle, thread, start, end in spans.tolist()]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, file_path=TRACE_PATH, cycle=None):
+        with open(file_path, 'w') as f:
+            json.dump(self.chrome_trace(cycle), f)
+
+# Default tracer, enabled with PICK_TRACE=1
+tracer = Tracer(enabled=os.environ.get('PICK_TRACE', '') not in ('', '0'))
+
+def span(stage, cycle=None):
+    return tracer.span(stage, cycle)
+
+# Decorator timing every call of a function as one span of stage
+def traced(stage):
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+            with _Span(tracer, stage, None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
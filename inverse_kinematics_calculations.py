@@ -1,20 +1,23 @@
 """
-Inverse Kinematics for Robotic Arm with Visualization
+Inverse Kinematics for Robotic Arm
 
 Calculates the angles for a planar robotic arm to reach a target position (X, Y) and the Z axis. 
-Visualizes the arm's configuration using matplotlib. 
+The solvers have no plotting side effects; use arm_visualization.py to draw the arm's configuration. 
+The batch functions solve whole arrays of targets at once with NumPy and flag 
+unreachable targets in a mask instead of raising from math.acos.
 This file is imported into motor_movement_control.py.
 """
 
 from cmath import pi
 import math
-import matplotlib.pyplot as plt
+import numpy as np
+
+# Link lengths (cm)
+L1 = 22               #28
+L2 = 20               #22
+L3 = 19               #18
 
 def inverse_kinematics(X, Y):
-    L1 = 22               #28
-    L2 = 20               #22
-    L3 = 19               #18
-    
     X2 = X
     Y2 = Y + L3
     
@@ -25,44 +28,28 @@ def inverse_kinematics(X, Y):
     f12 = math.acos(((L1 * L1) + (L2 * L2) - (L_base * L_base)) / (2 * L1 * L2)) * 180 / pi   
     f1 = phi - f_base
     f2 = 180 - f12                                                               
-    base_2_Ang = f12 - (90 - f1) - 90 # f1
-    base_2_rad = base_2_Ang * pi / 180
-
-    X0 = 0
-    Y0 = 0
-    X3 = X
-    Y3 = Y
 
     X1 = L1 * math.cos(f1 * pi / 180)
     Y1 = L1 * math.sin(f1 * pi / 180)
 
     len_p3_p1 = math.sqrt(((X - X1) * (X - X1) + (Y - Y1) * (Y - Y1)))
     f23 = math.acos(((L1 * L1) + (L2 * L2) - (len_p3_p1 * len_p3_p1)) / (2 * L1 * L2)) * 180 / pi     
-    
-    X_link1 = [X0,X1]
-    Y_link1 = [Y0,Y1]
-    X_link2 = [X1,X2]
-    Y_link2 = [Y1,Y2]
-    X_link3 = [X2,X3]
-    Y_link3 = [Y2,Y3]
-    #931 lab ppt17
-    plt.annotate("origin",(X0,Y0))
-    plt.annotate("point1",(X1,Y1))
-    plt.annotate("point2",(X2,Y2))
-    plt.annotate("point3",(X3,Y3))
-    plt.plot(X_link1, Y_link1, label="link1",color='orange',linestyle='solid')
-    plt.plot(X_link2, Y_link2, label="link2",color='blue',linestyle='solid')
-    plt.plot(X_link3, Y_link3, label="link3",color='green',linestyle='solid')
-    plt.title('Simulation')
-    plt.grid(linestyle = 'solid',color = 'graY')
-    plt.xlim(-8.6,40)
-    plt.ylim(-50,50)
-    plt.xlabel('X Axis',fontsize = 15)
-    plt.ylabel('Y Axis',fontsize = 15)
-    plt.show()
 
     return f1, f2, f23
 
+"""
+    Joint positions of the planar arm when it reaches (X, Y), used for visualization.
+    
+    :param X: X coordinate of the target position
+    :param Y: Y coordinate of the target position
+    :return: [origin, point1, point2, point3] as (x, y) tuples
+"""
+def link_positions(X, Y):
+    f1 = inverse_kinematics(X, Y)[0]
+    X1 = L1 * math.cos(f1 * pi / 180)
+    Y1 = L1 * math.sin(f1 * pi / 180)
+    return [(0, 0), (X1, Y1), (X, Y + L3), (X, Y)]
+
 """
     Calculate the relationship between Z and X in a plane.
     
@@ -96,6 +83,80 @@ def calculate_all_angles(X, Y, Z):
 
     return Ang_XZ, Ang_XY[0], Ang_XY[1], Ang_XY[2]
 
+"""
+    Batch version of inverse_kinematics for arrays of (X, Y) targets.
+    
+    :param X: array of X coordinates
+    :param Y: array of Y coordinates
+    :return: f1, f2, f23 arrays (degrees, NaN where unreachable) and a boolean reachable mask
+"""
+def inverse_kinematics_batch(X, Y):
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    X, Y = np.broadcast_arrays(X, Y)
+
+    X2 = X
+    Y2 = Y + L3
+    L_base = np.hypot(X2, Y2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cos_phi = ((L_base * L_base) + (L1 * L1) - (L2 * L2)) / (2 * L_base * L1)
+        cos_f12 = ((L1 * L1) + (L2 * L2) - (L_base * L_base)) / (2 * L1 * L2)
+        reachable = (X2 != 0) & (L_base > 0) & (np.abs(cos_phi) <= 1) & (np.abs(cos_f12) <= 1)
+
+        phi = np.degrees(np.arccos(np.clip(cos_phi, -1, 1)))
+        f_base = np.degrees(np.arctan(-Y2 / X2))
+        f12 = np.degrees(np.arccos(np.clip(cos_f12, -1, 1)))
+        f1 = phi - f_base
+        f2 = 180 - f12
+
+        X1 = L1 * np.cos(np.radians(f1))
+        Y1 = L1 * np.sin(np.radians(f1))
+        len_p3_p1 = np.hypot(X - X1, Y - Y1)
+        cos_f23 = ((L1 * L1) + (L2 * L2) - (len_p3_p1 * len_p3_p1)) / (2 * L1 * L2)
+        reachable &= np.abs(cos_f23) <= 1
+        f23 = np.degrees(np.arccos(np.clip(cos_f23, -1, 1)))
+
+    f1 = np.where(reachable, f1, np.nan)
+    f2 = np.where(reachable, f2, np.nan)
+    f23 = np.where(reachable, f23, np.nan)
+    return f1, f2, f23, reachable
+
+"""
+    Batch version of inverse_kinematics_flat.
+    
+    :param flat_Z: array of Z coordinates
+    :param flat_X: array of X coordinates
+    :return: base angle array (NaN where X = 0) and a boolean valid mask
+"""
+def inverse_kinematics_flat_batch(flat_Z, flat_X):
+    flat_Z = np.asarray(flat_Z, dtype=float)
+    flat_X = np.asarray(flat_X, dtype=float)
+    valid = flat_X != 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Ang = np.degrees(np.arctan(flat_Z / flat_X))
+    # Both branches of inverse_kinematics_flat reduce to 90 - Ang
+    Ang = np.where(valid, 90 - Ang, np.nan)
+    return Ang, valid
+
+"""
+    Calculate all relevant angles for many targets in one pass.
+    
+    :param X: array of X coordinates of the target positions
+    :param Y: array of Y coordinates of the target positions
+    :param Z: array of Z coordinates of the target positions
+    :return: (N, 4) array of (base, f1, f2, f23) angles and a boolean reachable mask of length N
+"""
+def calculate_all_angles_batch(X, Y, Z):
+    X, Y, Z = np.broadcast_arrays(np.asarray(X, dtype=float), np.asarray(Y, dtype=float), np.asarray(Z, dtype=float))
+    f1, f2, f23, reachable = inverse_kinematics_batch(X, Y)
+    Ang_XZ, valid = inverse_kinematics_flat_batch(Z, X)
+    reachable = reachable & valid
+
+    angles = np.stack([Ang_XZ, f1, f2, f23], axis=-1)
+    angles[~reachable] = np.nan
+    return angles, reachable
+
 if __name__ == "__main__":
     X = 20           # X=20,Y=-20,Z=30
     Y = -20          # fixed because the object is on the table
@@ -110,9 +171,5 @@ if __name__ == "__main__":
     print('f3 = ', motor_ang[2])
     print('f5 = ', motor_ang[3])
 
-
-
-
-
-	
-	
+    import arm_visualization
+    arm_visualization.show_arm(X, Y)
@@ -1,15 +1,20 @@
 """
 This code executes a complete cycle for a robotic arm, handling the initialization, catching, 
-and releasing of an object while visualizing the arm's configuration.
+and releasing of an object.
 
 1. **Motor Control**: Manages six motors with specified positions for catching and releasing objects, 
-     with gradual movement implementation for smooth operation.
+     with time-parameterized waypoints (trajectory_generation.py) for smooth operation.
+     The joint state lives in a thread-safe RobotState (robot_state.py).
+     With SERVO_PORT set, the waypoints are streamed to the servo controller (servo_driver.py).
+     With PICK_TRACE=1, every stage of a cycle is timed (instrumentation.py) and pick_trace.json is written.
 2. **Inverse Kinematics**: Calculates required angles based on target coordinates for accurate positioning.
 3. **PWM Conversion**: Converts calculated angles to PWM signals for motor movement.
 4. **Safety Initialization**: Moves motors to a safe starting position before operations.
 5. **Gripper Action**: Controls the gripper for catching and releasing tasks.
-6. **Visualization**: Uses Matplotlib to display the robotic arm's link positions and pose during operation.
-7. **Logging**: Writes PWM values and operation orders to a file for tracking movements.
+6. **Visualization**: The IK solve is headless; arm_visualization.py can render a planned trajectory afterwards.
+7. **Logging**: Writes PWM values and operation orders to a buffered command log (command_log.py) for tracking movements.
+
+   Run with --all to pick every detected object in one session (run_pick_sequence).
 
    Complete movement steps: 
         initialize_safety_positionssafety_positions 
@@ -19,51 +24,46 @@ and releasing of an object while visualizing the arm's configuration.
 """
 import sys
 import os
+import atexit
 import inverse_kinematics_calculations as iv
+import pwm_calibration as pwm
+import trajectory_generation as tg
+import command_log as cl
+import target_scheduler as ts
+import pick_sequence as ps
+import pose_cache
+import robot_state as rs
+import servo_driver as sd
+import instrumentation as it
 sys.path.append('.')
-from coordinate_conversion import final_coord
+import coordinate_conversion
           
-# Motor Information
-#             #NO,  left(0),  45,  90,  135, right(180),init, cur  
-              #     open                      close
-              #0     1       2     3    4      5         6    7     
-motor_info =[[ 0,    45,     65,  95,  120,   147,      95,   95],                           #Motor 0 : Base
-			 [ 2,   140,    115,  80,   50,    26,      26,   26],                           #Motor 2
-			 [ 3,    90,     90,  65,   40,    20,      20,   20],                           #Motor 3
-             [ 5,   105,    105,  80,   55,    25,      25,   25],                           #Motor 5
-             [ 7,    70,     70,  70,   70,    115,     115,  115],
-             [ 4,    100,   100,  100,  100,   100,     100,  100]]                          #Motor 7
+# Joint state of the arm: PWM table, limits, initial/current positions and aim points (robot_state.py)
+robot = rs.RobotState()
 motor_names = ['Motor_0(PWM)', 'Motor_2(PWM)', 'Motor_3(PWM)', 'Motor_5(PWM)', 'Motor_7(PWM)', 'Motor_4(PWM)']
-#Aim Point             #Catch      #Release
-                  #No  #Ang #PWM  
-                  #0   1      2    3    4
-motor_ang_info = [[0,  0,     0,   0,   0],
-                  [2,  0,     0,   0,   0],
-                  [3,  0,     0,   0,   0],
-                  [5,  0,     0,   0,   0]]
-
-#Convert real angle to motor PWM value
-def convert_angle_to_pwm(Motor_No, Angle):
-    global angle_m
 
-    #Define the angle range and corresponding values for each motor.
-    motor_ranges = {
-        0: [(0, 45, 45, 0), (45, 90, 65, 45), (90, 135, 95, 90), (135, 180, 120, 135)],
-        1: [(0, 45, 140, 0), (45, 90, 115, 45), (90, 135, 80, 90), (135, 180, 50, 135)],
-        2: [(45, 90, 90, 45), (90, 135, 65, 90), (135, 180, 40, 135)],
-        3: [(45, 90, 105, 45), (90, 135, 80, 90), (135, 180, 55, 135)],
-    }
+# PWM command log, pwm.txt by default (set PWM_LOG_PATH to change it), flushed at exit
+pwm_sink = cl.FileCommandSink()
+atexit.register(pwm_sink.close)
 
-    if Motor_No not in motor_ranges:
-        raise ValueError(f"Invalid Motor_No: {Motor_No}")
+# Servo controller link (servo_driver.py), only when SERVO_PORT names a serial port or 'loopback'
+servo = sd.open_driver(os.environ.get('SERVO_PORT'), robot.positions())
+if servo is not None:
+    atexit.register(servo.close)
 
-    for low, high, value, base in motor_ranges[Motor_No]:
-        if low < Angle <= high:
-            rate = (value - base) / (high - low)
-            angle_m = (Angle - low) * rate + base
-            return angle_m
-
-    raise ValueError(f"Angle {Angle} out of range for motor {Motor_No}")
+#Convert real angle to motor PWM value
+#The segment tables are compiled once in pwm_calibration.py
+def convert_angle_to_pwm(Motor_No, Angle, calibration=None):
+    if calibration is None:
+        calibration = pwm.default_calibration
+
+    if isinstance(Angle, (int, float)):
+        PWM, in_range = calibration.angle_to_pwm_scalar(Motor_No, Angle)
+    else:
+        PWM, in_range = calibration.angle_to_pwm(Motor_No, Angle)
+    if not in_range:
+        raise ValueError(f"Angle {Angle} out of range for motor {Motor_No}")
+    return float(PWM)
 
 # Convert multiple motor angles to PWM simultaneously
 def convert_all_angles_to_pwm_To_Motor(motor0,motor2,motor3,motor5):
@@ -73,103 +73,90 @@ def convert_all_angles_to_pwm_To_Motor(motor0,motor2,motor3,motor5):
     PWM5 = convert_angle_to_pwm(5,motor5)
     return PWM0,PWM2,PWM3,PWM5
 
-# Simulate motor movement mode by sending PWM values (+1 or -1) to motors, making them gradually move
-def move_motor(Motor_No, Motor_Angle, mode):	
-    # Adjust the motor number to the array index, Motor No refer to motor_info[]
-    if Motor_No == 2: Motor_No = 1
-    if Motor_No == 3: Motor_No = 2
-    if Motor_No == 5: Motor_No = 3
-    if Motor_No == 7: Motor_No = 4
-    
-    # check angle not out the limit
-    if Motor_Angle < motor_info[Motor_No][1] : Motor_Angle = motor_info[Motor_No][1]
-    if Motor_Angle > motor_info[Motor_No][5] : Motor_Angle = motor_info[Motor_No][5]
-
-    #Current
-    if mode == 'c': m = 7
-    #Initial
-    elif mode == 'i': m = 6
-    
-    # Move the motor to the target angle step by step，if it's Motor 5, move inversely
-    while motor_info[Motor_No][m] != Motor_Angle:  
-        if motor_info[Motor_No][m] < Motor_Angle:  
-            motor_info[Motor_No][m] += 1  
-            if Motor_No == 5:  
-                motor_info[3][m] -= 1  
-
-        elif motor_info[Motor_No][m] > Motor_Angle:  
-            motor_info[Motor_No][m] -= 1 
-            if Motor_No == 5: 
-                motor_info[3][m] += 1  
+# Move a motor to the target PWM value and return its time-parameterized waypoints
+# The motor state jumps straight to the target; the waypoints are streamed to the servo driver when there is one
+def move_motor(Motor_No, Motor_Angle, mode, profile='trapezoidal', step_rate=tg.DEFAULT_STEP_RATE, state=None):
+    if state is None:
+        state = robot
+
+    with state:
+        # check angle not out the limit
+        Motor_Angle = state.clamp(Motor_No, Motor_Angle)
+        times, waypoints = tg.generate_trajectory(state.get(Motor_No, mode), Motor_Angle, profile, step_rate)
+        state.set(Motor_No, Motor_Angle, mode)
+    if servo is not None and state is robot and mode == 'c':
+        servo.play(times, waypoints, [Motor_No])
+    return times, waypoints[:, 0]
+
+#Move several motors together so that they all arrive at the same time.
+#targets maps motor number to PWM; stages optionally orders groups of motor numbers where
+#collision safety needs it, e.g. [[7], [0, 2, 3, 5]] moves the gripper before the arm.
+def coordinated_move(targets, mode='c', stages=None, profile='trapezoidal', step_rate=tg.DEFAULT_STEP_RATE, state=None):
+    if state is None:
+        state = robot
+
+    motors = list(targets)
+    columns = {n: i for i, n in enumerate(motors)}
+    stage_columns = [[columns[n] for n in stage] for stage in (stages or [])]
+    with state:
+        start = state.positions(motors, mode)
+        # check PWM not out the limit
+        goal = {n: state.clamp(n, targets[n]) for n in motors}
+        times, waypoints = tg.generate_synchronized_trajectory(start, list(goal.values()), stage_columns, profile, step_rate)
+        state.set_positions(goal, mode)
+    if servo is not None and state is robot and mode == 'c':
+        servo.play(times, waypoints, motors)
+    return times, waypoints
 
 # Set initial safety values before activating the robotic arm          
 def initialize_safety_positions(On):
     if On == 1 :
         print("\n\n") 
 
-        initial_pwm = [motor_info[i][6] for i in range(5)] + [100]  # Collect initial PWM values
+        initial_pwm = robot.positions(mode='i')  # Collect initial PWM values
         print('Initial Motor Names: ', motor_names)
         print('Initial PWM Values: ', initial_pwm)
 
-        # Move motors to the initial safe position
-        positions = [95, 26, 20, 25, 115]  # Corresponding positions for each motor
-        for i, pos in enumerate(positions):
-            move_motor(i * 2, pos, 'i')  # Move motor at index i * 2 to the specified position
-
-        for i in range(5):
-            motor_info[i][7] = motor_info[i][6]
+        # Move motors 0, 2, 3, 5 and 7 together to the initial safe position
+        trajectory = coordinated_move(pose_cache.default_cache.fixed_pose('safety'), 'c')
 
         print("------------------------------------------------------------------------------------------------")
-        current_pwm = [motor_info[i][7] for i in range(5)] + [100]
+        current_pwm = robot.positions()
         print('Current Motor Names: ', motor_names)
         print('Current PWM Values: ', current_pwm)
+        return trajectory
 
 #Middle Catch : is the intermediate point the robotic arm passes between the initial catch and the release.        
-def move_to_intermediate_position(On,Motor_PWM_0,name,M7):
+@it.traced('intermediate')
+def move_to_intermediate_position(On,Motor_PWM_0,name,M7,stages=None):
     if On == 1 :
 
-        # Move motors to the specified positions
-        motor_positions = [Motor_PWM_0, 80, 65, 25, M7]
-        for i, pos in enumerate(motor_positions):
-            move_motor(i * 2, pos, 'c')  # Move motors 0, 2, 3, 5, and 7
-
-        # Update motor_info for the new positions
-        motor_info[0][7] = Motor_PWM_0 
-        motor_info[1][7] = 80
-        motor_info[2][7] = 65
-        motor_info[3][7] = 25
-        motor_info[4][7] = M7
+        # Move motors 0, 2, 3, 5 and 7 together to the specified positions
+        motor_positions = {0: Motor_PWM_0, **pose_cache.default_cache.fixed_pose('intermediate'), 7: M7}
+        trajectory = coordinated_move(motor_positions, 'c', stages)
 
         print("-----------------------------------------------------------------------------------------------") 
         
         # Collect the PWM values
-        middle_list = [motor_info[i][7] for i in range(5)] + [100]  
+        middle_list = robot.positions()
         print(f"{name} : {motor_names}") 
         print(f"{name} : {middle_list}")
+        return trajectory
 
-#Move all motors sequentially to the specified positions in the following order
-#starting from the motor closest to the robot base.
-def move_all_motors(Motor_Angle_0,Motor_Angle_2,Motor_Angle_3,Motor_Angle_5,m7):
-    move_motor(0, Motor_Angle_0, 'c')
-    move_motor(2, Motor_Angle_2, 'c')
-    move_motor(3, Motor_Angle_3, 'c')
-    move_motor(5, Motor_Angle_5, 'c')
-
-    if m7 == 'o':
-        move_motor(7, 70,'c')
-        m7 = 70 #
-    if m7 == 'c':
-        move_motor(7, 115,'c')
-        m7 = 115#
+#Move all motors together to the specified positions, they all arrive at the same time.
+#Pass stages to keep an order, e.g. [[7]] opens the gripper before the arm descends.
+def move_all_motors(Motor_Angle_0,Motor_Angle_2,Motor_Angle_3,Motor_Angle_5,m7,stages=None):
+    if m7 == 'o': m7 = 70
+    if m7 == 'c': m7 = 115
 
     temp = [Motor_Angle_0,Motor_Angle_2,Motor_Angle_3,Motor_Angle_5,m7]
-    for i in range(5):
-        motor_info[i][7] = temp[i] 
+    trajectory = coordinated_move(dict(zip(rs.MOVING_JOINTS, temp)), 'c', stages)
     print("---------------------------------------------------------------------------------------------------")
 
-    Current_PWM = [motor_info[0][7],motor_info[1][7],motor_info[2][7],motor_info[3][7],motor_info[4][7],100]
+    Current_PWM = robot.positions()
     print('Current_name : ',motor_names)
     print('Current_PWM : ',Current_PWM)
+    return trajectory
 
     """Control the gripper (open/close) using Motor7. 
     使用示例
@@ -177,106 +164,189 @@ def move_all_motors(Motor_Angle_0,Motor_Angle_2,Motor_Angle_3,Motor_Angle_5,m7):
         gripper_action('release', 1)  # 釋放
     """
 
+@it.traced('gripper')
 def gripper_action(action, On):
     if On == 1:
         if action == 'catch':
             print("------------------------------------------CATCH------------------------------------------------")
             move_motor(7, 115, 'c')
-            motor_info[4][7] = 115
         elif action == 'release':
             print("------------------------------------------RELEASE----------------------------------------------")
             move_motor(7, 70, 'c')
-            motor_info[4][7] = 70
         else:
             print("Invalid action. Please use 'catch' or 'release'.")
         
-        Current_PWM = [motor_info[0][7], motor_info[1][7], motor_info[2][7], motor_info[3][7], motor_info[4][7], 100]
+        Current_PWM = robot.positions()
         print('Current_name : ', motor_names)
         print('Current_PWM : ', Current_PWM)
 
 #Inverse Kinematics:Given the target position coordinates, calculate the required angles.   
-def calculate_angles_for_target(X,Y,Z,n,name): #Catch Point [][n=1](Ang)  n=2(PWM) Release Point [][n=3](Ang) n=4(PWM)
+@it.traced('ik')
+def calculate_angles_for_target(X,Y,Z,n,name): #Catch Point n=1 Release Point n=3
     print(" ")
     print(name,":"," X = ",X,"Y =", Y,"Z =",Z)
 
-    motor_ang = iv.Inv_Kine_All(X,Y,Z) 
+    motor_ang = iv.calculate_all_angles(X,Y,Z) 
     motor_ang = [motor_ang[0],motor_ang[1],motor_ang[2],motor_ang[3]]
-    update_motor_angles(motor_ang[0],motor_ang[1],motor_ang[2],motor_ang[3],n) 
-
-    ALL = convert_all_angles_to_pwm_To_Motor(motor_ang_info[0][n],motor_ang_info[1][n],motor_ang_info[2][n],motor_ang_info[3][n])
-    ALL =[ALL[0],ALL[1],ALL[2],ALL[3]]
-    for i in range (4):
-        motor_ang_info[i][n+1] = ALL[i]
+    ALL = convert_all_angles_to_pwm_To_Motor(motor_ang[0],motor_ang[1],motor_ang[2],motor_ang[3])
+    update_motor_angles(motor_ang[0],motor_ang[1],motor_ang[2],motor_ang[3],n,ALL)
 
     Aim_Poi_name  = ['Motor_0(PWM)','Motor_2(PWM)','Motor_3(PWM)','Motor_5(PWM)']
-    Aim_Poi_list = [motor_ang_info[0][n+1],motor_ang_info[1][n+1],motor_ang_info[2][n+1],motor_ang_info[3][n+1]]
+    Aim_Poi_list = list(ALL)
     print(name," : ",Aim_Poi_name)
     print(name," : ",Aim_Poi_list)
     
-#Write Aim Angle to motor_info as Global Variable
-#Store the calculated inverse kinematics angles for each axis of the target position in a 2D list called motor_ang_info.
-def update_motor_angles(motor0,motor2,motor3,motor5,p):
-    motor = [motor0,motor2,motor3,motor5]
-    for i in range (4):
-        motor_ang_info[i][p] = motor[i]
-    return motor_ang_info[0][p],motor_ang_info[1][p],motor_ang_info[2][p],motor_ang_info[3][p]
+#Store the calculated inverse kinematics angles (and PWM values) for each axis of the target position
+#as the catch (p=1) or release (p=3) aim point of the robot state.
+def update_motor_angles(motor0,motor2,motor3,motor5,p,PWM=None):
+    point = 'catch' if p == 1 else 'release'
+    angles = [motor0,motor2,motor3,motor5]
+    robot.set_aim(point, angles, robot.aim_pwm(point) if PWM is None else PWM)
+    return tuple(robot.aim_angles(point))
 
 #Given the coordinates for releasing  an object, use the inverse kinematics program to calculate the required angles.
+#The release point is fixed, so its angles and PWM are solved once and then taken from the pose cache.
 def calculate_release_anglesnt(On):
     if On == 1:
-        X=10
-        Y=-18
-        Z=27
-        calculate_angles_for_target(X,Y,Z,3,'Release Point')
+        angles, PWM = pose_cache.default_cache.pose('release', ts.RELEASE_POINT)
+        robot.set_aim('release', angles, PWM)
+        print('Release Point : ', ['Motor_0(PWM)','Motor_2(PWM)','Motor_3(PWM)','Motor_5(PWM)'])
+        print('Release Point : ', list(PWM))
 
 def convert_all_angles_to_pwm_To_M(On):
     if On == 1:
-        Motor_PWM = []
-        Motor_PWM[0] = convert_angle_to_pwm(0,motor_ang_info[0][1])
-        Motor_PWM[1] = convert_angle_to_pwm(0,motor_ang_info[1][1])
-        Motor_PWM[2] = convert_angle_to_pwm(0,motor_ang_info[2][1])
-        Motor_PWM[3] = convert_angle_to_pwm(0,motor_ang_info[3][1])
-
-#Write the PWM values for each step motor to pwm.txt.
-def write_pwm_to_file(order):
-    motor_info_Write = [str(order),0,0,0,0,0,0]
-    for i in range(6):
-            motor_info_Write[i+1] = ','+str(motor_info[i][7]) 
-    with open('C:\\Users\\a12\\Desktop\\YOLO_V5\\pwm.txt','a') as f:
-        f.writelines(motor_info_Write)
-        f.write('\n')
+        angles = robot.aim_angles('catch')
+        Motor_PWM = [convert_angle_to_pwm(motor, angle) for motor, angle in zip(rs.AIM_JOINTS, angles)]
+        return Motor_PWM
+
+#Write the PWM values for each step motor to the command log.
+#The log is buffered and written in batches; see command_log.py for the sinks and the path setting.
+def write_pwm_to_file(order, sink=None):
+    if sink is None:
+        sink = pwm_sink
+    sink.write(order, robot.positions())
     
-if __name__ == "__main__":
+#Pick every planned object in one session (see pick_sequence.py).
+#The arm only returns to the safety pose between picks when the plan marks it via_safety,
+#and the release point angles are taken from the plan instead of being solved each cycle.
+#initialize/finish: start from and return to the safety pose (off when the caller handles it, e.g. pipeline.py)
+#cycle: trace cycle of the picks, e.g. the pipeline frame id; each pick starts a new cycle when omitted
+def run_pick_sequence(plan, sink=None, initialize=True, finish=True, order=0, cycle=None):
+    if initialize:
+        initialize_safety_positions(1)
+        order += 1
+        write_pwm_to_file(order, sink)
+
+    for n, pick in enumerate(plan):
+        with it.tracer.in_cycle(it.tracer.new_cycle() if cycle is None else cycle):
+            print(f"\n==================================== PICK {n + 1} / {len(plan)} ====================================")
+            if pick['via_safety']:
+                initialize_safety_positions(1)
+                order += 1
+                write_pwm_to_file(order, sink)
+
+            target_pwm = [float(v) for v in pick['pwm']]
+            release_pwm = [float(v) for v in pick['release_pwm']]
+            print("Object Point : X =", pick['target'][0], "Y =", pick['target'][1], "Z =", pick['target'][2])
+
+            move_to_intermediate_position(1,target_pwm[0],'Front',robot.get(7))
+            order += 1
+            write_pwm_to_file(order, sink)
+            with it.span('approach'):
+                move_all_motors(*target_pwm,'o',[[7]])
+            order += 1
+            write_pwm_to_file(order, sink)
+            gripper_action('catch', 1)
+            order += 1
+            write_pwm_to_file(order, sink)
+            move_to_intermediate_position(1,target_pwm[0],'Back',robot.get(7))
+            order += 1
+            write_pwm_to_file(order, sink)
+            with it.span('release'):
+                move_all_motors(*release_pwm,'c')
+            order += 1
+            write_pwm_to_file(order, sink)
+            gripper_action('release', 1)
+            order += 1
+            write_pwm_to_file(order, sink)
+
+    #Back to start position once the tray is done
+    if finish:
+        initialize_safety_positions(1)
+        order += 1
+        write_pwm_to_file(order, sink)
+    return order
+
+#Execute one planned pick without returning to the safety pose, used by the pipelined loop (pipeline.py)
+#order is the last step order written so far; returns the new one. cycle is the trace cycle, e.g. the frame id
+def execute_pick(plan, sink=None, order=0, cycle=None):
+    return run_pick_sequence(plan, sink, initialize=False, finish=False, order=order, cycle=cycle)
+
+#Print the stage timings and write the Chrome trace of the session when PICK_TRACE=1
+def report_trace(file_path=it.TRACE_PATH):
+    if it.tracer.enabled:
+        print("\nStage timings:")
+        it.tracer.print_stats()
+        it.tracer.save_chrome_trace(file_path)
+        print("Trace written to", file_path)
+
+#One complete pick cycle of the object at final_coord (robot X, Z): safety pose => catch => release => safety pose
+#Writes steps 1 to 8 to the command log.
+def run_single_pick(final_coord, sink=None):
     initialize_safety_positions(1)
-    write_pwm_to_file(1)
+    write_pwm_to_file(1, sink)
 
     #Move Front To Aim Point      
     X=final_coord[0]   
     #fixed because the object is on the table -20+2.8-1 = -16.2        
-    Y=-16.2               
+    Y=ts.TABLE_Y
     Z=final_coord[1]
 
     calculate_angles_for_target(X,Y,Z,1,'Object Point')
     #Middle
-    move_to_intermediate_position(1,motor_ang_info[0][2],'Front',motor_info[4][7])    
-    write_pwm_to_file(2)
-    move_all_motors(motor_ang_info[0][2],motor_ang_info[1][2],motor_ang_info[2][2],motor_ang_info[3][2],'o')   
-    write_pwm_to_file(3)
+    catch_pwm = robot.aim_pwm('catch')
+    move_to_intermediate_position(1,catch_pwm[0],'Front',robot.get(7))    
+    write_pwm_to_file(2, sink)
+    #Open the gripper before descending so the open jaws do not sweep into the brick
+    with it.span('approach'):
+        move_all_motors(*catch_pwm,'o',[[7]])
+    write_pwm_to_file(3, sink)
     #Catch
     gripper_action('catch', 1)
-    write_pwm_to_file(4)
+    write_pwm_to_file(4, sink)
 
     #Move Back Middle
-    move_to_intermediate_position(1,motor_ang_info[0][2],'Back',motor_info[4][7])
-    write_pwm_to_file(5)
+    move_to_intermediate_position(1,catch_pwm[0],'Back',robot.get(7))
+    write_pwm_to_file(5, sink)
     #Calculate Release Point
     calculate_release_anglesnt(1)
-    move_all_motors(motor_ang_info[0][4],motor_ang_info[1][4],motor_ang_info[2][4],motor_ang_info[3][4],'c')  
-    write_pwm_to_file(6)
+    with it.span('release'):
+        move_all_motors(*robot.aim_pwm('release'),'c')
+    write_pwm_to_file(6, sink)
     gripper_action('release', 1)
-    write_pwm_to_file(7)
+    write_pwm_to_file(7, sink)
     #Back to start position
     initialize_safety_positions(1)
-    write_pwm_to_file(8)
+    write_pwm_to_file(8, sink)
+
+if __name__ == "__main__" and '--all' in sys.argv:
+    #Pick every detected object in one session, in travel-optimized order
+    targets = coordinate_conversion.convert_detections(coordinate_conversion.db.load_label_file('label_coordinate.txt'))
+    plan, skipped, travel = ps.plan_pick_sequence(targets)
+    for i in skipped:
+        print(f"Skipping unreachable {targets['name'][i]} at (X = {targets['robot_x'][i]}, Z = {targets['robot_z'][i]})")
+    print(f"Planned {len(plan)} picks, total base travel {travel:.1f} degrees")
+    run_pick_sequence(plan)
     print("___________________________________F   I   N   I   S   H_________________________________________") 
-    
+    report_trace()
+
+elif __name__ == "__main__":
+    #Pick the next object automatically, no prompt
+    it.tracer.new_cycle()
+    final_coord = coordinate_conversion.main()
+    if final_coord is None:
+        sys.exit(1)
+
+    run_single_pick(final_coord)
+    print("___________________________________F   I   N   I   S   H_________________________________________")
+    report_trace()
@@ -0,0 +1,169 @@
+"""
+Multi-object pick sequence planning.
+
+Plans a whole tray of picks in one session instead of N independent single-shot runs:
+
+1. Solves IK and PWM for every target at once (batch IK + compiled PWM calibration); release
+   points come from the named-pose cache (pose_cache.py).
+2. Orders the picks to minimize the travel that depends on the order. run_pick_sequence moves
+   from the previous release point to the intermediate pose above the target (base already turned
+   to the target), down to the target, back up to the intermediate pose and on to the release point.
+   The arm joints always pass through the fixed intermediate pose, so only the base rotation depends
+   on the previous pick: from the previous release point to the target and from the target to its
+   own release point, through the safety pose when the first turn is too large. With a single
+   release point for every class every order costs the same but for the first pick, so only the
+   first pick is chosen and the rest keep the input order. With per-class release points a greedy
+   nearest-neighbour tour is improved with 2-opt.
+3. Marks the picks that must go through the safety pose first: the arm turns its base straight from
+   the previous release point to the next target only when that is at most max_direct_travel degrees.
+"""
+
+import numpy as np
+import pwm_calibration as pwm
+import pose_cache
+import target_scheduler as ts
+
+DEFAULT_MAX_DIRECT_TRAVEL = 90.0    # degrees of base rotation
+
+PICK_DTYPE = np.dtype([
+    ('index', '<i4'),               # row of the target in the input array
+    ('target', '<f8', (3,)),        # X, Y, Z
+    ('angles', '<f8', (4,)),        # base, f1, f2, f23
+    ('pwm', '<f8', (4,)),           # motors 0, 2, 3, 5
+    ('release_angles', '<f8', (4,)),
+    ('release_pwm', '<f8', (4,)),
+    ('via_safety', '?'),
+])
+
+# Total cost of visiting picks in order, cost[i + 1, j] is the cost of pick j after pick i, cost[0, j] from the start
+def tour_cost(order, cost):
+    previous = np.concatenate([[0], np.asarray(order[:-1], dtype=int) + 1])
+    return float(cost[previous, order].sum())
+
+# Greedy nearest-neighbour tour
+def greedy_order(cost):
+    n = cost.shape[1]
+    remaining = list(range(n))
+    order = []
+    row = 0
+    while remaining:
+        nxt = min(remaining, key=lambda j: cost[row, j])
+        order.append(nxt)
+        remaining.remove(nxt)
+        row = nxt + 1
+    return order
+
+# Improve a tour by reversing segments while that lowers the total cost
+# The cost is asymmetric, so a reversal also flips the direction of every edge inside the segment;
+# prefix sums of the forward and backward edge costs along the tour give each candidate's change in O(1)
+def two_opt(order, cost, max_rounds=50):
+    order = np.asarray(order, dtype=int)
+    n = len(order)
+    for _ in range(max_rounds):
+        improved = False
+        for i in range(n - 1):
+            forward = np.concatenate([[0.0], np.cumsum(cost[order[:-1] + 1, order[1:]])])
+            backward = np.concatenate([[0.0], np.cumsum(cost[order[1:] + 1, order[:-1]])])
+            previous = 0 if i == 0 else order[i - 1] + 1
+            k = np.arange(i + 1, n)
+            # Edge out of the reversed segment; the last pick has none
+            following = order[np.minimum(k + 1, n - 1)]
+            has_next = k < n - 1
+            old = cost[previous, order[i]] + forward[k] - forward[i] + np.where(has_next, cost[order[k] + 1, following], 0.0)
+            new = cost[previous, order[k]] + backward[k] - backward[i] + np.where(has_next, cost[order[i] + 1, following], 0.0)
+            change = new - old
+            best = int(np.argmin(change))
+            if change[best] < -1e-9:
+                order[i:k[best] + 1] = order[i:k[best] + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+    order = order.tolist()
+    return order, tour_cost(order, cost)
+
+"""
+    Plan the order and joint targets of a whole sequence of picks.
+
+    :param targets: structured array with robot_x, robot_z, class_id and name fields
+    :param release_points: (X, Y, Z) used for every class, or {class name or id: (X, Y, Z)}
+    :param start_angles: joint angles the arm starts from, the first release point's angles when omitted
+    :param max_direct_travel: largest base turn (degrees) allowed without going through the safety pose
+    :param grid: optional workspace_grid.WorkspaceGrid used to filter unreachable targets
+    :param joint_angles: (angles, reachable) of the targets when already solved, e.g. cached by tracking.Tracker
+    :return: PICK_DTYPE array in pick order, indices of targets that cannot be picked, and the total base travel (degrees)
+"""
+def plan_pick_sequence(targets, release_points=ts.RELEASE_POINT, start_angles=None,
+                       max_direct_travel=DEFAULT_MAX_DIRECT_TRAVEL, calibration=None, table_y=ts.TABLE_Y,
+                       poses=None, grid=None, joint_angles=None):
+    if calibration is None:
+        calibration = pwm.default_calibration
+    if poses is None:
+        poses = pose_cache.default_cache
+        if calibration is not poses.calibration:
+            poses = pose_cache.PoseCache(calibration)
+
+    if joint_angles is None:
+        joint_angles = ts.target_joint_angles(targets, table_y, grid)
+    angles, reachable = joint_angles
+    pwms, in_range = calibration.joint_angles_to_pwm(angles)
+    pickable = np.flatnonzero(reachable & in_range)
+    skipped = np.flatnonzero(~(reachable & in_range))
+
+    # Release point of every pickable target, each distinct point looked up once
+    release_cache = {}
+    release_of = []
+    for i in pickable:
+        if isinstance(release_points, dict):
+            point = release_points.get(str(targets['name'][i]), release_points.get(int(targets['class_id'][i])))
+            if point is None:
+                raise ValueError(f"No release point for class {targets['name'][i]}")
+        else:
+            point = release_points
+        point = tuple(float(v) for v in point)
+        if point not in release_cache:
+            release_angles, release_pwm = poses.pose('release', point)
+            release_cache[point] = (np.array(release_angles), np.array(release_pwm))
+        release_of.append(point)
+
+    n = len(pickable)
+    plan = np.zeros(n, dtype=PICK_DTYPE)
+    if n == 0:
+        return plan, skipped, 0.0
+
+    target_angles = angles[pickable]
+    release_angles = np.array([release_cache[p][0] for p in release_of])
+    if start_angles is None:
+        start_angles = release_angles[0]
+    start_angles = np.asarray(start_angles, dtype=float)
+
+    # Base rotation (degrees) of the move from pick i's release point (row i + 1, row 0 is the start)
+    # to the intermediate pose above target j, through the safety pose when it is too large
+    safety_base = float(calibration.pwm_to_angle(0, poses.fixed_pose('safety')[0])[0])
+    origin_base = np.concatenate([[start_angles[0]], release_angles[:, 0]])
+    target_base = target_angles[:, 0]
+    direct = np.abs(origin_base[:, np.newaxis] - target_base[np.newaxis, :])
+    via_safety = direct > max_direct_travel
+    detour = np.abs(origin_base - safety_base)[:, np.newaxis] + np.abs(safety_base - target_base)[np.newaxis, :]
+    # cost[i + 1, j]: base travel of pick j after pick i, on to j's release point
+    cost = np.where(via_safety, detour, direct) + np.abs(target_base - release_angles[:, 0])
+
+    if len(release_cache) == 1:
+        # Every pick but the first starts from the same release point, so only the first one matters
+        first = int(np.argmin(cost[0] - cost[1]))
+        order = [first] + [j for j in range(n) if j != first]
+        total = tour_cost(order, cost)
+    else:
+        order, total = two_opt(greedy_order(cost), cost)
+
+    rows = pickable[order]
+    plan['index'] = rows
+    plan['target'] = np.stack([targets['robot_x'][rows], np.full(n, table_y), targets['robot_z'][rows]], axis=-1)
+    plan['angles'] = target_angles[order]
+    plan['pwm'] = pwms[rows]
+    plan['release_angles'] = release_angles[order]
+    plan['release_pwm'] = [release_cache[release_of[j]][1] for j in order]
+    # The first pick always starts from the safety pose
+    origins_of_order = np.concatenate([[0], np.asarray(order[:-1], dtype=int) + 1])
+    plan['via_safety'] = via_safety[origins_of_order, order]
+    plan['via_safety'][0] = False
+    return plan, skipped, total
@@ -0,0 +1,268 @@
+"""
+Pipelined capture => detect => plan => execute loop.
+
+Runs the four stages of a pick cycle on their own threads with bounded queues between them, so
+the next frame is captured, detected and planned while the arm is still executing the current pick.
+
+    capture -> [frames]     -> detect -> [detections] -> plan -> [plans] -> execute
+
+Queue policies:
+    frames     : newest wins; when the detector falls behind, the oldest frame is dropped
+    detections : blocking; the detector waits for the planner (backpressure)
+    plans      : newest wins; the arm always executes the freshest plan
+
+Every item is a dict that collects the stage results ('frame_id', 'stamp', 'frame', 'detections',
+'plan'). A stage function returns the item (or None to drop it). make_pick_stages builds the stages
+for the LEGO cell from a FrameGrabber, a detector and the existing conversion and motion code,
+optionally with a tracking.Tracker and FrameGate to skip repeated conversion, IK and detection.
+"""
+
+import queue
+import collections
+import threading
+import time
+import numpy as np
+import instrumentation as it
+
+# Put an item, dropping the oldest queued item when the queue is full; returns True if one was dropped
+def put_newest(q, item):
+    dropped = False
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                q.get_nowait()
+                dropped = True
+            except queue.Empty:
+                pass
+
+class Pipeline:
+    """Four-stage threaded pipeline with bounded queues."""
+
+    STAGES = ('capture', 'detect', 'plan', 'execute')
+
+    def __init__(self, capture, detect, plan, execute, queue_size=1, max_errors=100):
+        self.functions = {'capture': capture, 'detect': detect, 'plan': plan, 'execute': execute}
+        self.queues = {name: queue.Queue(maxsize=queue_size) for name in ('frames', 'detections', 'plans')}
+        self.stats = {name: 0 for name in self.STAGES}
+        self.stats.update(dropped_frames=0, dropped_plans=0, errors=0)
+        self.errors = collections.deque(maxlen=max_errors)     # newest (stage, exception) pairs
+        self._stop = threading.Event()
+        self._threads = []
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    # Call a stage function, recording failures instead of killing the stage thread
+    # With instrumentation enabled, each call and the spans inside it belong to the item's frame id
+    def _call(self, name, *args):
+        cycle = args[0].get('frame_id') if args else None
+        try:
+            with it.tracer.in_cycle(cycle), it.span(name, cycle):
+                return self.functions[name](*args)
+        except Exception as exc:
+            self.errors.append((name, exc))
+            self._count('errors')
+            return None
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.05)
+            except queue.Empty:
+                continue
+        return None
+
+    def _capture_loop(self):
+        while not self._stop.is_set():
+            item = self._call('capture')
+            if item is None:
+                continue
+            self._count('capture')
+            if put_newest(self.queues['frames'], item):
+                self._count('dropped_frames')
+
+    def _detect_loop(self):
+        while not self._stop.is_set():
+            item = self._get(self.queues['frames'])
+            if item is None:
+                continue
+            item = self._call('detect', item)
+            if item is None:
+                continue
+            self._count('detect')
+            while not self._stop.is_set():
+                try:
+                    self.queues['detections'].put(item, timeout=0.05)
+                    break
+                except queue.Full:
+                    continue
+
+    def _plan_loop(self):
+        while not self._stop.is_set():
+            item = self._get(self.queues['detections'])
+            if item is None:
+                continue
+            item = self._call('plan', item)
+            if item is None:
+                continue
+            self._count('plan')
+            if put_newest(self.queues['plans'], item):
+                self._count('dropped_plans')
+
+    def _execute_loop(self):
+        while not self._stop.is_set():
+            item = self._get(self.queues['plans'])
+            if item is None:
+                continue
+            if self._call('execute', item) is not None:
+                self._count('execute')
+
+    def start(self):
+        self._stop.clear()
+        loops = (self._capture_loop, self._detect_loop, self._plan_loop, self._execute_loop)
+        self._threads = [threading.Thread(target=loop, name=f"pipeline-{name}", daemon=True)
+                         for loop, name in zip(loops, self.STAGES)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    # Run until max_picks picks were executed or duration seconds have passed
+    def run(self, max_picks=None, duration=None):
+        start = time.monotonic()
+        self.start()
+        try:
+            while True:
+                if max_picks is not None and self.stats['execute'] >= max_picks:
+                    break
+                if duration is not None and time.monotonic() - start >= duration:
+                    break
+                time.sleep(0.01)
+        finally:
+            self.stop()
+        return self.stats
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+"""
+    Build the stage functions of the LEGO pick cell.
+
+    :param grabber: running camera_capture.FrameGrabber
+    :param detector: callable frame -> detection batch (detection_batch.DETECTION_DTYPE)
+    :param execute_pick: callable execute_pick(plan, order=..., cycle=...) that moves the arm through a
+                         one-row PICK_DTYPE plan, tracing it as cycle (the frame id), and returns the
+                         last step order written to the command log; motor_movement_control.execute_pick
+                         by default
+    :param calibration: plane_calibration.PlaneCalibration, plane_calibration.default_calibration() when omitted
+    :param pick_radius: targets within this distance (cm) of a brick picked after the frame was
+                        captured are treated as already picked
+    :param tracker: optional tracking.Tracker reusing the coordinates and IK of bricks that did not move
+    :param gate: optional tracking.FrameGate; detection is skipped while the frame has not changed
+    :return: capture, detect, plan and execute functions for Pipeline
+"""
+def make_pick_stages(grabber, detector, execute_pick=None, calibration=None, pick_radius=2.0, tracker=None, gate=None,
+                     **plan_options):
+    import coordinate_conversion as cc
+    import pick_sequence as ps
+    import plane_calibration as pc
+
+    if execute_pick is None:
+        import motor_movement_control as mm
+        execute_pick = mm.execute_pick
+    if calibration is None:
+        calibration = pc.default_calibration()
+    picked = []          # (completion time, X, Z) of executed picks
+    last_id = [-1]
+    last_detections = [None]     # (detections, stamp of the frame they were detected on)
+    order = [0]          # last step order written by execute_pick
+
+    def capture():
+        frame, frame_id, stamp = grabber.wait_for_frame(last_id[0], timeout=0.5, copy=True)
+        if frame is None:
+            return None
+        last_id[0] = frame_id
+        return {'frame_id': frame_id, 'stamp': stamp, 'frame': frame}
+
+    def detect(item):
+        changed = gate is None or gate.changed(item['frame'])
+        if changed or last_detections[0] is None:
+            last_detections[0] = (detector(item['frame']), item['stamp'])
+        # Reused detections keep their own stamp, so bricks picked since then are still filtered out
+        item['detections'], item['stamp'] = last_detections[0]
+        item['frame'] = None
+        return item
+
+    def plan(item):
+        if tracker is not None:
+            targets, (angles, reachable), _ = tracker.update(item['detections'])
+        else:
+            targets = cc.convert_detections(item['detections'], calibration)
+        # Bricks picked while this frame was in flight are still in the picture
+        keep = np.ones(len(targets), dtype=bool)
+        for done, x, z in list(picked):
+            if done >= item['stamp']:
+                keep &= np.hypot(targets['robot_x'] - x, targets['robot_z'] - z) >= pick_radius
+        rows = np.flatnonzero(keep)
+        options = dict(plan_options)
+        if tracker is not None:
+            options['joint_angles'] = (angles[rows], reachable[rows])
+        sequence, _, _ = ps.plan_pick_sequence(targets[rows], **options)
+        if not len(sequence):
+            return None
+        # Index into the frame's detections, not the filtered targets
+        sequence['index'] = rows[sequence['index']]
+        item['plan'] = sequence
+        return item
+
+    def execute(item):
+        pick = item['plan'][:1]
+        x, z = pick['target'][0, 0], pick['target'][0, 2]
+        if any(done >= item['stamp'] and np.hypot(px - x, pz - z) < pick_radius for done, px, pz in picked):
+            return None
+        order[0] = execute_pick(pick, order=order[0], cycle=item['frame_id'])
+        picked.append((time.monotonic(), x, z))
+        del picked[:-100]
+        # The tray has changed; detect the next frame even if the gate sees no difference
+        if gate is not None:
+            gate.reset()
+        return item
+
+    return capture, detect, plan, execute
+
+# Run the cell unattended with a YOLOv5 model: python pipeline.py best.pt
+if __name__ == "__main__":
+    import sys
+    import torch
+    import detection_batch as db
+    import camera_capture
+    import tracking
+    import motor_movement_control as mm
+
+    model = torch.hub.load('ultralytics/yolov5', 'custom', path=sys.argv[1] if len(sys.argv) > 1 else 'best.pt')
+
+    def detector(frame):
+        return db.from_xyxy(model(frame[..., ::-1]).xyxy[0], model.names)
+
+    with camera_capture.CameraManager() as camera:
+        mm.initialize_safety_positions(1)
+        stages = make_pick_stages(camera.grabber, detector, tracker=tracking.Tracker(), gate=tracking.FrameGate())
+        try:
+            stats = Pipeline(*stages).run()
+        except KeyboardInterrupt:
+            stats = None
+        mm.initialize_safety_positions(1)
+    print("Pipeline stats:", stats)
@@ -0,0 +1,147 @@
+"""
+Pixel => table => robot calibration of the camera plane.
+
+The mapping from YOLOv5 pixel coordinates to real table coordinates (cm) is fitted once from
+N reference points, as an affine transform (N >= 3) or a homography (N >= 4), and persisted to
+plane_calibration.json. The real_to_robot_coord offset is folded into the same 3x3 matrix, so
+all detections are converted with a single vectorized matrix product.
+
+Without a calibration file the original two-point model is used:
+    real_x = u * 64.6 / 640, real_y = v * 48.5 / 640, robot (X, Z) = (real_y, 32.3 - real_x)
+"""
+
+import json
+import numpy as np
+
+CALIBRATION_PATH = 'plane_calibration.json'
+
+# Robot X axis runs along the table's y axis, robot Z = ROBOT_OFFSET - table x
+ROBOT_OFFSET = 32.3
+ROBOT_FROM_REAL = np.array([[0.0, 1.0, 0.0],
+                            [-1.0, 0.0, ROBOT_OFFSET],
+                            [0.0, 0.0, 1.0]])
+
+# Pixel => table mapping of the original two-point linear model
+DEFAULT_PIXEL_TO_REAL = np.array([[64.6 / 640, 0.0, 0.0],
+                                  [0.0, 48.5 / 640, 0.0],
+                                  [0.0, 0.0, 1.0]])
+
+# Apply a 3x3 projective matrix to an (N, 2) array of points
+def transform_points(matrix, points):
+    points = np.asarray(points, dtype=float)
+    flat = points.reshape(-1, 2)
+    mapped = flat @ matrix[:, :2].T + matrix[:, 2]
+    return (mapped[:, :2] / mapped[:, 2:3]).reshape(points.shape)
+
+# Similarity transform that centers points and scales their mean distance to sqrt(2)
+def _normalization(points):
+    center = points.mean(axis=0)
+    scale = np.sqrt(2) / max(np.mean(np.linalg.norm(points - center, axis=1)), 1e-12)
+    return np.array([[scale, 0, -scale * center[0]],
+                     [0, scale, -scale * center[1]],
+                     [0, 0, 1]])
+
+"""
+    Fit a pixel => table mapping from reference points.
+
+    :param pixel_points: (N, 2) YOLOv5 pixel coordinates
+    :param real_points: (N, 2) matching table coordinates (cm)
+    :param model: 'affine' (N >= 3) or 'homography' (N >= 4)
+    :return: 3x3 matrix
+"""
+def fit_transform(pixel_points, real_points, model='affine'):
+    src = np.asarray(pixel_points, dtype=float).reshape(-1, 2)
+    dst = np.asarray(real_points, dtype=float).reshape(-1, 2)
+    if len(src) != len(dst):
+        raise ValueError("pixel_points and real_points must have the same length")
+
+    if model == 'affine':
+        if len(src) < 3:
+            raise ValueError("An affine fit needs at least 3 reference points")
+        A = np.hstack([src, np.ones((len(src), 1))])
+        params, _, rank, _ = np.linalg.lstsq(A, dst, rcond=None)
+        if rank < 3:
+            raise ValueError("Reference points are collinear")
+        return np.vstack([params.T, [0.0, 0.0, 1.0]])
+
+    if model == 'homography':
+        if len(src) < 4:
+            raise ValueError("A homography fit needs at least 4 reference points")
+        T_src, T_dst = _normalization(src), _normalization(dst)
+        s = transform_points(T_src, src)
+        d = transform_points(T_dst, dst)
+        rows = []
+        for (x, y), (u, v) in zip(s, d):
+            rows.append([-x, -y, -1, 0, 0, 0, u * x, u * y, u])
+            rows.append([0, 0, 0, -x, -y, -1, v * x, v * y, v])
+        _, _, vt = np.linalg.svd(np.array(rows))
+        H = np.linalg.inv(T_dst) @ vt[-1].reshape(3, 3) @ T_src
+        return H / H[2, 2]
+
+    raise ValueError(f"Invalid model: {model}, expected 'affine' or 'homography'")
+
+class PlaneCalibration:
+    """Pixel => table => robot mapping as 3x3 matrices."""
+
+    def __init__(self, pixel_to_real=None, robot_from_real=None):
+        self.pixel_to_real = np.array(DEFAULT_PIXEL_TO_REAL if pixel_to_real is None else pixel_to_real, dtype=float)
+        self.robot_from_real = np.array(ROBOT_FROM_REAL if robot_from_real is None else robot_from_real, dtype=float)
+        # Combined pixel => robot matrix
+        self.matrix = self.robot_from_real @ self.pixel_to_real
+
+    @classmethod
+    def fit(cls, pixel_points, real_points, model='affine', robot_from_real=None):
+        return cls(fit_transform(pixel_points, real_points, model), robot_from_real)
+
+    # Table coordinates (cm) of (N, 2) pixel points
+    def to_real(self, pixel_points):
+        return transform_points(self.pixel_to_real, pixel_points)
+
+    # Robot (X, Z) coordinates of (N, 2) pixel points
+    def to_robot(self, pixel_points):
+        return transform_points(self.matrix, pixel_points)
+
+    # Root mean square error (cm) of the pixel => table fit on reference points
+    def residual(self, pixel_points, real_points):
+        error = self.to_real(pixel_points) - np.asarray(real_points, dtype=float)
+        return float(np.sqrt(np.mean(np.sum(error * error, axis=-1))))
+
+    def save(self, file_path=CALIBRATION_PATH):
+        with open(file_path, 'w') as f:
+            json.dump({'pixel_to_real': self.pixel_to_real.tolist(),
+                       'robot_from_real': self.robot_from_real.tolist()}, f, indent=2)
+
+    @classmethod
+    def load(cls, file_path=CALIBRATION_PATH):
+        with open(file_path, 'r') as f:
+            data = json.load(f)
+        return cls(data['pixel_to_real'], data.get('robot_from_real'))
+
+# Load the persisted calibration, or the original two-point model when there is none
+def load_calibration(file_path=CALIBRATION_PATH):
+    try:
+        return PlaneCalibration.load(file_path)
+    except FileNotFoundError:
+        return PlaneCalibration()
+
+# Calibration shared by callers that pass none, loaded from CALIBRATION_PATH once per process
+_default_calibration = None
+
+def default_calibration():
+    global _default_calibration
+    if _default_calibration is None:
+        _default_calibration = load_calibration()
+    return _default_calibration
+
+# Fit from a CSV of reference points ("u,v,real_x,real_y" per line) and save the calibration
+if __name__ == "__main__":
+    import sys
+
+    points_path = sys.argv[1] if len(sys.argv) > 1 else 'calibration_points.csv'
+    model = sys.argv[2] if len(sys.argv) > 2 else 'affine'
+    points = np.loadtxt(points_path, delimiter=',', ndmin=2)
+
+    calibration = PlaneCalibration.fit(points[:, :2], points[:, 2:4], model)
+    calibration.save()
+    print("Pixel to real matrix:\n", calibration.pixel_to_real)
+    print("RMS error (cm):", calibration.residual(points[:, :2], points[:, 2:4]))
@@ -0,0 +1,106 @@
+"""
+Cache of named fixed poses (release point, intermediate pose, safety pose).
+
+Poses given by coordinates are solved once (IK + PWM) and kept by pose name and coordinates, so
+fixed poses hit on every cycle cost a dictionary lookup. The cache is tied to the link lengths in
+inverse_kinematics_calculations.py and to the PWM calibration: when either changes, every entry is
+dropped and solved again on the next use. The cache can be saved to and loaded from a JSON file;
+entries saved with a different calibration are ignored on load.
+
+Poses given directly as PWM values (FIXED_POSES) are kept as ready-made {motor number: PWM} dicts;
+fixed_pose() hands out copies so callers cannot change the cache.
+"""
+
+import json
+import hashlib
+import numpy as np
+import inverse_kinematics_calculations as iv
+import pwm_calibration as pwm
+
+POSE_CACHE_PATH = 'pose_cache.json'
+
+# PWM values of the poses defined directly in PWM, keyed by motor number.
+# The intermediate pose keeps the base (motor 0) and gripper (motor 7) where they are.
+FIXED_POSES = {
+    'safety': {0: 95, 2: 26, 3: 20, 5: 25, 7: 115},
+    'intermediate': {2: 80, 3: 65, 5: 25},
+}
+
+class PoseCache:
+    """Joint angles and PWM values of named poses, solved once per calibration."""
+
+    def __init__(self, calibration=None, fixed_poses=FIXED_POSES):
+        self.calibration = calibration if calibration is not None else pwm.default_calibration
+        self.fixed_poses = {name: dict(pose) for name, pose in fixed_poses.items()}
+        self._entries = {}
+        self._key = None
+        self._fingerprint = None
+
+    # Cheap identity of the current calibration, compared on every lookup
+    def _calibration_key(self):
+        return (iv.L1, iv.L2, iv.L3, id(self.calibration))
+
+    # Stable digest of the link lengths and PWM segments, stored with persisted entries
+    def fingerprint(self):
+        key = self._calibration_key()
+        if key != self._key:
+            self._entries.clear()
+            self._key = key
+            data = json.dumps({'links': [iv.L1, iv.L2, iv.L3],
+                               'segments': sorted((str(m), s) for m, s in self.calibration.motor_ranges.items())})
+            self._fingerprint = hashlib.sha1(data.encode()).hexdigest()
+        return self._fingerprint
+
+    def invalidate(self):
+        self._entries.clear()
+        self._key = None
+
+    """
+        Joint angles and PWM values of a pose given by coordinates.
+
+        :param name: pose name, e.g. 'release'
+        :param coords: (X, Y, Z) of the pose
+        :return: angles (base, f1, f2, f23) and PWM values (motors 0, 2, 3, 5) as tuples
+    """
+    def pose(self, name, coords):
+        self.fingerprint()
+        key = (name, tuple(float(v) for v in coords))
+        entry = self._entries.get(key)
+        if entry is None:
+            angles = iv.calculate_all_angles(*key[1])
+            pwms, in_range = self.calibration.joint_angles_to_pwm(np.array(angles))
+            if not in_range:
+                raise ValueError(f"Pose {name} {key[1]} is out of the PWM range")
+            entry = (tuple(float(a) for a in angles), tuple(float(p) for p in pwms))
+            self._entries[key] = entry
+        return entry
+
+    # {motor number: PWM} of a pose defined directly in PWM, as a new dict
+    def fixed_pose(self, name):
+        return dict(self.fixed_poses[name])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def save(self, file_path=POSE_CACHE_PATH):
+        entries = [{'name': name, 'coords': list(coords), 'angles': list(angles), 'pwm': list(pwms)}
+                   for (name, coords), (angles, pwms) in self._entries.items()]
+        with open(file_path, 'w') as f:
+            json.dump({'fingerprint': self.fingerprint(), 'entries': entries}, f, indent=2)
+
+    # Load persisted entries; returns the number loaded (0 when the calibration has changed)
+    def load(self, file_path=POSE_CACHE_PATH):
+        try:
+            with open(file_path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0
+        if data.get('fingerprint') != self.fingerprint():
+            return 0
+        for entry in data['entries']:
+            key = (entry['name'], tuple(entry['coords']))
+            self._entries[key] = (tuple(entry['angles']), tuple(entry['pwm']))
+        return len(data['entries'])
+
+# Shared cache of the default calibration
+default_cache = PoseCache()
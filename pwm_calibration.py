@@ -0,0 +1,123 @@
+"""
+Angle <=> PWM calibration for the arm motors.
+
+Each motor's piecewise linear segments (low, high, value, base) are compiled once into sorted
+NumPy breakpoint arrays, so whole arrays of angles can be converted with np.searchsorted.
+Single angles take angle_to_pwm_scalar, a bisect over the same breakpoints kept as tuples, which
+avoids the NumPy call overhead in the per-move path.
+An angle A in (low, high] maps to (A - low) * (value - base) / (high - low) + base,
+exactly as convert_angle_to_pwm in motor_movement_control.py always did.
+
+The calibration object is read-only after construction and safe to share between threads.
+"""
+
+import math
+import bisect
+import numpy as np
+
+# Angle range and corresponding values for each motor, keyed by motor number.
+#          (low, high, value, base)
+MOTOR_RANGES = {
+    0: [(0, 45, 45, 0), (45, 90, 65, 45), (90, 135, 95, 90), (135, 180, 120, 135)],
+    2: [(0, 45, 140, 0), (45, 90, 115, 45), (90, 135, 80, 90), (135, 180, 50, 135)],
+    3: [(45, 90, 90, 45), (90, 135, 65, 90), (135, 180, 40, 135)],
+    5: [(45, 90, 105, 45), (90, 135, 80, 90), (135, 180, 55, 135)],
+}
+
+class PWMCalibration:
+    """Compiled per-motor angle <=> PWM lookup tables."""
+
+    def __init__(self, motor_ranges=None):
+        if motor_ranges is None:
+            motor_ranges = MOTOR_RANGES
+        self.motor_ranges = {motor: sorted(segments) for motor, segments in motor_ranges.items()}
+        self._tables = {}
+        self._segments = {}
+        for motor, segments in self.motor_ranges.items():
+            low, high, value, base = np.array(segments, dtype=float).T
+            rate = (value - base) / (high - low)
+            # PWM values at both ends of each segment, used for the inverse mapping
+            pwm_a = base
+            pwm_b = (high - low) * rate + base
+            self._tables[motor] = (low, high, rate, base, np.minimum(pwm_a, pwm_b), np.maximum(pwm_a, pwm_b))
+            self._segments[motor] = tuple(tuple(column.tolist()) for column in (low, high, rate, base))
+
+    @property
+    def motors(self):
+        return sorted(self._tables)
+
+    def _table(self, motor_no):
+        if motor_no not in self._tables:
+            raise ValueError(f"Invalid Motor_No: {motor_no}")
+        return self._tables[motor_no]
+
+    """
+        Convert angles to PWM values.
+
+        :param motor_no: motor number (0, 2, 3 or 5)
+        :param angles: scalar or array of angles (degrees)
+        :return: PWM array (NaN where out of range) and a boolean in-range mask
+    """
+    def angle_to_pwm(self, motor_no, angles):
+        low, high, rate, base, _, _ = self._table(motor_no)
+        angles = np.asarray(angles, dtype=float)
+
+        idx = np.searchsorted(high, angles, side='left')
+        seg = np.minimum(idx, len(high) - 1)
+        in_range = (idx < len(high)) & (angles > low[seg])
+
+        pwm = (angles - low[seg]) * rate[seg] + base[seg]
+        return np.where(in_range, pwm, np.nan), in_range
+
+    # Convert one angle; returns the PWM value (NaN when out of range) and whether it is in range
+    def angle_to_pwm_scalar(self, motor_no, angle):
+        if motor_no not in self._segments:
+            raise ValueError(f"Invalid Motor_No: {motor_no}")
+        low, high, rate, base = self._segments[motor_no]
+        i = bisect.bisect_left(high, angle)
+        if i < len(high) and angle > low[i]:
+            return (angle - low[i]) * rate[i] + base[i], True
+        return math.nan, False
+
+    """
+        Convert PWM values back to angles.
+
+        When several segments produce the same PWM value, the smallest angle is returned.
+
+        :param motor_no: motor number (0, 2, 3 or 5)
+        :param pwms: scalar or array of PWM values
+        :return: angle array (NaN where no segment produces the value) and a boolean valid mask
+    """
+    def pwm_to_angle(self, motor_no, pwms):
+        low, high, rate, base, pwm_min, pwm_max = self._table(motor_no)
+        pwms = np.asarray(pwms, dtype=float)[..., np.newaxis]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            candidates = low + (pwms - base) / rate
+        # Flat segments map every angle to the same PWM; take the top of the segment
+        candidates = np.where(rate == 0, high, candidates)
+        hits = (pwms >= pwm_min) & (pwms <= pwm_max) & (candidates > low) & (candidates <= high)
+
+        valid = hits.any(axis=-1)
+        first = np.argmax(hits, axis=-1)
+        angles = np.take_along_axis(candidates, first[..., np.newaxis], axis=-1)[..., 0]
+        return np.where(valid, angles, np.nan), valid
+
+    """
+        Convert an (N, len(motors)) array of joint angles to PWM values column by column.
+
+        :param angles: array whose last axis follows the order of motors
+        :param motors: motor number of each column
+        :return: PWM array and a boolean mask that is True where every joint is in range
+    """
+    def joint_angles_to_pwm(self, angles, motors=(0, 2, 3, 5)):
+        angles = np.asarray(angles, dtype=float)
+        pwms = np.empty_like(angles)
+        in_range = np.ones(angles.shape[:-1], dtype=bool)
+        for column, motor_no in enumerate(motors):
+            pwms[..., column], ok = self.angle_to_pwm(motor_no, angles[..., column])
+            in_range &= ok
+        return pwms, in_range
+
+# Shared default calibration, compiled once at import
+default_calibration = PWMCalibration()
@@ -0,0 +1,174 @@
+"""
+Offline replay of recorded pick cycles.
+
+Streams recorded detection files (label_coordinate.txt format) through the coordinate conversion,
+IK and motion code and collects the PWM commands in memory instead of driving the arm. Nothing
+sleeps and the per-step printing is silenced, so cycles replay much faster than real time on a
+CPU-only machine.
+
+With a recorded command log (pwm.txt, CSV or binary), the log is split into cycles where the step
+order starts again, cycle i of the log is compared with detection file i, and every step whose PWM
+differs by more than the tolerance is reported.
+
+    python replay.py labels/ --log pwm.txt                 # regression check
+    python replay.py labels/ --output baseline.txt         # record a new baseline
+    python replay.py label_coordinate.txt --repeat 1000    # profile
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+import contextlib
+import numpy as np
+import command_log as cl
+import detection_batch as db
+import plane_calibration as pc
+import coordinate_conversion as cc
+import pick_sequence as ps
+import robot_state as rs
+import motor_movement_control as mm
+
+DEFAULT_TOLERANCE = 0.01
+
+# Index arrays of the cycles in a log; a cycle starts wherever the step order does not increase
+def split_cycles(orders):
+    orders = np.asarray(orders)
+    if not len(orders):
+        return []
+    return np.split(np.arange(len(orders)), np.flatnonzero(np.diff(orders) <= 0) + 1)
+
+# Label files from files, directories (every .txt file in them) and glob patterns, in sorted order
+def label_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.txt'))))
+        elif any(c in path for c in '*?['):
+            files.extend(sorted(glob.glob(path)))
+        else:
+            files.append(path)
+    return files
+
+"""
+    Compare the commands of one replayed cycle with the recorded ones.
+
+    :return: dict with the number of steps of both, the indices of the differing steps
+             (steps missing from either side count as differing) and the largest PWM difference
+"""
+def diff_commands(orders, pwm, recorded_orders, recorded_pwm, tolerance=DEFAULT_TOLERANCE):
+    n = min(len(orders), len(recorded_orders))
+    error = np.abs(np.asarray(pwm[:n], dtype=float) - np.asarray(recorded_pwm[:n], dtype=float))
+    bad = np.any(error > tolerance, axis=-1) | (np.asarray(orders[:n]) != np.asarray(recorded_orders[:n]))
+    mismatched = np.concatenate([np.flatnonzero(bad), np.arange(n, max(len(orders), len(recorded_orders)))])
+    return {
+        'steps': len(orders),
+        'recorded_steps': len(recorded_orders),
+        'mismatched': mismatched.tolist(),
+        'max_error': float(error.max()) if error.size else 0.0,
+    }
+
+class Replayer:
+    """Runs the motion code on recorded detections and collects the commands."""
+
+    def __init__(self, calibration=None, policy='nearest', sequence=False, quiet=True):
+        self.calibration = pc.default_calibration() if calibration is None else calibration
+        self.policy = policy
+        self.sequence = sequence        # pick every object per file (--all) instead of one
+        self.quiet = quiet
+        self._initial = rs.RobotState().snapshot()
+
+    # Commands of one cycle as step orders (N,) and PWM values (N, 6), the arm starting from rest
+    def run_cycle(self, detections):
+        sink = cl.MemoryCommandSink()
+        mm.robot.restore(self._initial)
+        if self.sequence:
+            targets = cc.convert_detections(detections, self.calibration)
+            plan, _, _ = ps.plan_pick_sequence(targets)
+            mm.run_pick_sequence(plan, sink)
+        else:
+            final_coord = cc.main(detections=detections, calibration=self.calibration, policy=self.policy)
+            if final_coord is not None:
+                mm.run_single_pick(final_coord, sink)
+        orders = np.array([order for order, _ in sink.records], dtype=np.int64)
+        pwm = np.array([values for _, values in sink.records], dtype=float).reshape(-1, cl.NUM_CHANNELS)
+        return orders, pwm
+
+    """
+        Replay detection files, optionally against a recorded command log.
+
+        :param files: label_coordinate.txt-format files, one cycle each
+        :param log_path: recorded command log to compare with
+        :param tolerance: largest PWM difference that still counts as equal
+        :param repeat: replay the files this many times (profiling)
+        :param output: command sink that receives every replayed command, e.g. to record a baseline
+        :return: report dict
+    """
+    def run(self, files, log_path=None, tolerance=DEFAULT_TOLERANCE, repeat=1, output=None):
+        detections = [db.load_label_file(f) for f in files]
+        recorded = None
+        if log_path is not None:
+            orders, pwm = cl.read_log(log_path)
+            recorded = [(orders[rows], pwm[rows]) for rows in split_cycles(orders)]
+
+        report = {'cycles': 0, 'steps': 0, 'matched': 0, 'mismatched': [], 'unmatched': 0}
+        # The servo link and the printing are not wanted while replaying
+        servo, mm.servo = mm.servo, None
+        start = time.perf_counter()
+        try:
+            with open(os.devnull, 'w') as devnull, \
+                    (contextlib.redirect_stdout(devnull) if self.quiet else contextlib.nullcontext()):
+                for _ in range(repeat):
+                    for i, batch in enumerate(detections):
+                        orders, pwm = self.run_cycle(batch)
+                        report['cycles'] += 1
+                        report['steps'] += len(orders)
+                        if output is not None:
+                            for order, values in zip(orders, pwm):
+                                output.write(order, values)
+                        if recorded is None:
+                            continue
+                        if i >= len(recorded):
+                            report['unmatched'] += 1
+                            continue
+                        diff = diff_commands(orders, pwm, *recorded[i], tolerance)
+                        if diff['mismatched']:
+                            report['mismatched'].append(dict(diff, file=files[i], cycle=i))
+                        else:
+                            report['matched'] += 1
+        finally:
+            mm.servo = servo
+        report['elapsed'] = time.perf_counter() - start
+        report['cycles_per_second'] = report['cycles'] / report['elapsed'] if report['elapsed'] else 0.0
+        if recorded is not None:
+            report['recorded_cycles'] = len(recorded)
+        return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded detections through the motion code")
+    parser.add_argument('labels', nargs='+', help="label files, directories or glob patterns, one cycle per file")
+    parser.add_argument('--log', help="recorded command log (pwm.txt) to compare with")
+    parser.add_argument('--all', action='store_true', help="pick every object of a file (motor_movement_control --all)")
+    parser.add_argument('--policy', default='nearest', help="target_scheduler policy of single picks")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output', help="write the replayed commands to this log")
+    args = parser.parse_args()
+
+    files = label_files(args.labels)
+    replayer = Replayer(policy=args.policy, sequence=args.all)
+    output = cl.FileCommandSink(args.output) if args.output else None
+    report = replayer.run(files, args.log, args.tolerance, args.repeat, output)
+    if output is not None:
+        output.close()
+
+    print(f"Replayed {report['cycles']} cycles ({report['steps']} steps) in {report['elapsed']:.3f} s, "
+          f"{report['cycles_per_second']:.0f} cycles/s")
+    if args.log:
+        print(f"{report['matched']} cycles match {args.log}, {len(report['mismatched'])} differ, "
+              f"{report['unmatched']} have no recorded cycle ({report['recorded_cycles']} recorded)")
+        for diff in report['mismatched']:
+            print(f"  {diff['file']}: steps {diff['mismatched']} differ (max error {diff['max_error']:.3f}, "
+                  f"{diff['steps']} replayed / {diff['recorded_steps']} recorded steps)")
+        sys.exit(1 if report['mismatched'] or report['unmatched'] else 0)
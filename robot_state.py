@@ -0,0 +1,129 @@
+"""
+Thread-safe joint state of the robotic arm.
+
+Replaces the motor_info / motor_ang_info lists that were indexed by magic column numbers.
+Joints are looked up by motor number; positions (PWM) are kept in NumPy arrays with one row
+for the initial and one for the current position, and the aim points (catch and release) keep
+their joint angles and PWM values for motors 0, 2, 3 and 5.
+
+Every method takes the state's lock, and "with state:" holds it across several calls. snapshot()
+returns an immutable copy that a planning thread can work from while another thread executes
+motion on the live state; restore() puts a snapshot back.
+"""
+
+import threading
+from collections import namedtuple
+import numpy as np
+
+# Motor numbers in display order (motor 4 is not driven during a cycle)
+JOINT_IDS = (0, 2, 3, 5, 7, 4)
+MOVING_JOINTS = (0, 2, 3, 5, 7)
+AIM_JOINTS = (0, 2, 3, 5)
+AIM_POINTS = ('catch', 'release')
+
+# Position modes, as used by move_motor: 'i' initial, 'c' current
+MODES = {'i': 0, 'c': 1}
+
+# PWM of each motor at 0, 45, 90, 135 and 180 degrees (left/open ... right/close)
+MOTOR_TABLE = {
+    0: (45, 65, 95, 120, 147),       # Base
+    2: (140, 115, 80, 50, 26),
+    3: (90, 90, 65, 40, 20),
+    5: (105, 105, 80, 55, 25),
+    7: (70, 70, 70, 70, 115),        # Gripper
+    4: (100, 100, 100, 100, 100),
+}
+INITIAL_POSITIONS = {0: 95, 2: 26, 3: 20, 5: 25, 7: 115, 4: 100}
+
+Snapshot = namedtuple('Snapshot', ['positions', 'aim_angles', 'aim_pwm'])
+
+class RobotState:
+    """Initial/current PWM of every joint and the aim points' angles and PWM."""
+
+    __slots__ = ('joint_ids', 'table', 'limits', '_index', '_positions', '_aim_angles', '_aim_pwm', '_lock')
+
+    def __init__(self, joint_ids=JOINT_IDS, table=MOTOR_TABLE, initial=INITIAL_POSITIONS):
+        self.joint_ids = tuple(joint_ids)
+        self._index = {joint: i for i, joint in enumerate(self.joint_ids)}
+        self.table = np.array([table[joint] for joint in self.joint_ids], dtype=float)
+        # PWM limits per joint, ordered low, high whichever end of the table they come from
+        self.limits = np.sort(self.table[:, [0, -1]], axis=1)
+        start = [initial[joint] for joint in self.joint_ids]
+        self._positions = np.array([start, start], dtype=float)
+        self._aim_angles = np.zeros((len(AIM_POINTS), len(AIM_JOINTS)))
+        self._aim_pwm = np.zeros((len(AIM_POINTS), len(AIM_JOINTS)))
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._lock.release()
+
+    def index(self, joint):
+        try:
+            return self._index[joint]
+        except KeyError:
+            raise ValueError(f"Invalid Motor_No: {joint}") from None
+
+    # Clamp a PWM value into the joint's limits
+    def clamp(self, joint, value):
+        low, high = self.limits[self.index(joint)]
+        return min(max(float(value), low), high)
+
+    def get(self, joint, mode='c'):
+        with self._lock:
+            return float(self._positions[MODES[mode], self.index(joint)])
+
+    def set(self, joint, value, mode='c'):
+        with self._lock:
+            self._positions[MODES[mode], self.index(joint)] = value
+
+    # PWM of several joints (all of them by default) as a list
+    def positions(self, joints=None, mode='c'):
+        rows = [self.index(j) for j in (self.joint_ids if joints is None else joints)]
+        with self._lock:
+            return self._positions[MODES[mode], rows].tolist()
+
+    # Set several joints at once from {motor number: PWM}
+    def set_positions(self, targets, mode='c'):
+        rows = [self.index(j) for j in targets]
+        with self._lock:
+            self._positions[MODES[mode], rows] = list(targets.values())
+
+    def set_aim(self, point, angles, pwm):
+        with self._lock:
+            self._aim_angles[AIM_POINTS.index(point)] = angles
+            self._aim_pwm[AIM_POINTS.index(point)] = pwm
+
+    def aim_angles(self, point):
+        with self._lock:
+            return self._aim_angles[AIM_POINTS.index(point)].tolist()
+
+    def aim_pwm(self, point):
+        with self._lock:
+            return self._aim_pwm[AIM_POINTS.index(point)].tolist()
+
+    def snapshot(self):
+        with self._lock:
+            arrays = tuple(a.copy() for a in (self._positions, self._aim_angles, self._aim_pwm))
+        for a in arrays:
+            a.flags.writeable = False
+        return Snapshot(*arrays)
+
+    def restore(self, snapshot):
+        with self._lock:
+            self._positions[...] = snapshot.positions
+            self._aim_angles[...] = snapshot.aim_angles
+            self._aim_pwm[...] = snapshot.aim_pwm
+
+    # Detached copy with its own lock, e.g. for planning the next pick
+    def copy(self):
+        state = RobotState.__new__(RobotState)
+        state.joint_ids, state.table, state.limits, state._index = self.joint_ids, self.table, self.limits, self._index
+        state._lock = threading.RLock()
+        with self._lock:
+            state._positions, state._aim_angles, state._aim_pwm = (
+                a.copy() for a in (self._positions, self._aim_angles, self._aim_pwm))
+        return state
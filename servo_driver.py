@@ -0,0 +1,248 @@
+"""
+Servo controller driver.
+
+Sends the PWM of all six channels (robot_state.JOINT_IDS order, the same as the command log) in one
+packet per frame instead of one command per channel:
+
+    0xFF 0xAA | count | count x uint16 little-endian (PWM * PWM_SCALE) | checksum
+
+The checksum is the low byte of the sum of the count and value bytes.
+
+ServoDriver coalesces updates: update() only changes the pending frame, and at most frame_rate
+frames per second go out, each carrying the newest values. play() streams a trajectory from
+trajectory_generation at the frame rate, skipping waypoints that fall between two frames.
+
+Transports:
+    SerialTransport   : pyserial port (pip install pyserial), imported only when used
+    LoopbackTransport : software simulator that decodes the frames and slews every servo towards
+                        its target at max_speed PWM units per second, for running without hardware
+
+open_driver(port) builds a driver from a port name, 'loopback' for the simulator.
+"""
+
+import time
+import threading
+import numpy as np
+import robot_state as rs
+
+HEADER = b'\xff\xaa'
+PWM_SCALE = 10                 # 0.1 PWM resolution on the wire
+DEFAULT_FRAME_RATE = 50        # frames per second the controller accepts
+DEFAULT_BAUDRATE = 115200
+DEFAULT_MAX_SPEED = 200.0      # simulated servo slew, PWM units per second
+
+# One multi-channel packet
+def encode_frame(values):
+    raw = np.rint(np.asarray(values, dtype=float) * PWM_SCALE)
+    if np.any(raw < 0) or np.any(raw > 0xffff):
+        raise ValueError(f"PWM value out of range: {values}")
+    payload = bytes([len(raw)]) + raw.astype('<u2').tobytes()
+    return HEADER + payload + bytes([sum(payload) & 0xff])
+
+# PWM values of every complete packet in data and the unparsed remainder; corrupt packets are skipped
+def decode_frames(data):
+    frames = []
+    errors = 0
+    start = data.find(HEADER)
+    while start >= 0:
+        if len(data) < start + 3:
+            break
+        count = data[start + 2]
+        end = start + 3 + 2 * count + 1
+        if len(data) < end:
+            break
+        payload = data[start + 2:end - 1]
+        if sum(payload) & 0xff == data[end - 1]:
+            frames.append(np.frombuffer(payload[1:], dtype='<u2') / PWM_SCALE)
+            start = data.find(HEADER, end)
+        else:
+            errors += 1
+            start = data.find(HEADER, start + 1)
+    remainder = data[start:] if start >= 0 else data[-1:] if data.endswith(HEADER[:1]) else b''
+    return frames, remainder, errors
+
+class SerialTransport:
+    """Serial port to the servo controller."""
+
+    def __init__(self, port, baudrate=DEFAULT_BAUDRATE, timeout=1.0):
+        import serial
+        self.port = serial.Serial(port, baudrate, timeout=timeout, write_timeout=timeout)
+
+    def write(self, data):
+        self.port.write(data)
+
+    def close(self):
+        self.port.close()
+
+class LoopbackTransport:
+    """Simulated controller; positions(t) is where the servos are at time t."""
+
+    def __init__(self, initial, max_speed=DEFAULT_MAX_SPEED, clock=time.monotonic):
+        self.max_speed = max_speed
+        self.clock = clock
+        self._position = np.array(initial, dtype=float)
+        self._target = self._position.copy()
+        self._stamp = clock()
+        self._buffer = b''
+        self.frames = []            # (time, PWM values) of every received frame
+        self.bytes_received = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    # Move every servo towards its target for the time since the last update
+    def _advance(self, now):
+        step = self.max_speed * max(now - self._stamp, 0.0)
+        self._position += np.clip(self._target - self._position, -step, step)
+        self._stamp = now
+
+    def write(self, data):
+        with self._lock:
+            now = self.clock()
+            self.bytes_received += len(data)
+            frames, self._buffer, errors = decode_frames(self._buffer + bytes(data))
+            self.errors += errors
+            for values in frames:
+                if len(values) != len(self._target):
+                    self.errors += 1
+                    continue
+                self._advance(now)
+                self._target = values
+                self.frames.append((now, values))
+
+    def positions(self, now=None):
+        with self._lock:
+            self._advance(self.clock() if now is None else now)
+            return self._position.copy()
+
+    def targets(self):
+        with self._lock:
+            return self._target.copy()
+
+    def settled(self, tolerance=0.5):
+        return bool(np.all(np.abs(self.positions() - self.targets()) <= tolerance))
+
+    def close(self):
+        pass
+
+class ServoDriver:
+    """Rate-limited, coalescing sender of multi-channel PWM frames."""
+
+    def __init__(self, transport, initial=None, channels=rs.JOINT_IDS, frame_rate=DEFAULT_FRAME_RATE,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.transport = transport
+        self.channels = tuple(channels)
+        self.frame_rate = frame_rate
+        self.clock = clock
+        self.sleep = sleep
+        self._column = {motor: i for i, motor in enumerate(self.channels)}
+        if initial is None:
+            initial = [rs.INITIAL_POSITIONS[motor] for motor in self.channels]
+        self._pending = np.array(initial, dtype=float)
+        self._dirty = False
+        self._next_send = clock()
+        self.stats = {'updates': 0, 'coalesced': 0, 'frames': 0, 'bytes': 0}
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+    # Change the pending frame from {motor number: PWM} or a full list of channel values
+    def update(self, values):
+        with self._lock:
+            if isinstance(values, dict):
+                for motor, value in values.items():
+                    self._pending[self._column[motor]] = value
+            else:
+                self._pending[:] = values
+            if self._dirty:
+                self.stats['coalesced'] += 1
+            self._dirty = True
+            self.stats['updates'] += 1
+
+    # Send the pending frame if there is one, waiting for the next frame slot when block is True
+    def send_pending(self, block=True):
+        now = self.clock()
+        if now < self._next_send:
+            if not block:
+                return False
+            self.sleep(self._next_send - now)
+            now = self._next_send
+        with self._lock:
+            if not self._dirty:
+                return False
+            packet = encode_frame(self._pending)
+            self._dirty = False
+        self.transport.write(packet)
+        self.stats['frames'] += 1
+        self.stats['bytes'] += len(packet)
+        self._next_send = max(now, self._next_send) + 1.0 / self.frame_rate
+        return True
+
+    def send(self, values):
+        self.update(values)
+        if not self._running:
+            self.send_pending()
+
+    """
+        Stream a trajectory at the frame rate.
+
+        :param times: waypoint times (s) from trajectory_generation
+        :param waypoints: (T, J) PWM waypoints
+        :param motors: motor numbers of the J columns, all channels when omitted
+    """
+    def play(self, times, waypoints, motors=None):
+        times = np.asarray(times, dtype=float)
+        waypoints = np.asarray(waypoints, dtype=float).reshape(len(times), -1)
+        if not len(times):
+            return
+        motors = self.channels if motors is None else list(motors)
+        # Newest waypoint at each frame slot; the last waypoint is always sent
+        slots = np.arange(0.0, times[-1], 1.0 / self.frame_rate)
+        rows = np.unique(np.append(np.searchsorted(times, slots, side='right') - 1, len(times) - 1))
+        self.stats['coalesced'] += len(times) - len(rows)
+        start = self.clock()
+        for row in rows:
+            delay = start + times[row] - self.clock()
+            if delay > 0:
+                self.sleep(delay)
+            self.send(dict(zip(motors, waypoints[row])))
+
+    # Send pending frames from a background thread instead of on every send()
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="servo-driver", daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        while self._running:
+            if not self.send_pending():
+                self.sleep(1.0 / self.frame_rate)
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.send_pending()
+
+    def close(self):
+        self.stop()
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+# Driver for a serial port name, the loopback simulator for 'loopback', or None without a port
+def open_driver(port, initial=None, **options):
+    if not port:
+        return None
+    if port == 'loopback':
+        channels = options.get('channels', rs.JOINT_IDS)
+        start = [rs.INITIAL_POSITIONS[motor] for motor in channels] if initial is None else initial
+        return ServoDriver(LoopbackTransport(start), initial, **options)
+    return ServoDriver(SerialTransport(port), initial, **options)
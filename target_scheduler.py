@@ -0,0 +1,69 @@
+"""
+Automatic pick-order scheduling for detected LEGO bricks.
+
+Takes the converted detections (coordinate_conversion.convert_detections) and returns the order
+in which the robot should pick them, without any prompt. Unreachable bricks are left out.
+
+Policies:
+    nearest        : closest to the robot base first (robot X, Z plane)
+    joint_travel   : least total joint travel from the start pose (the release point by default),
+                     which every pick starts from
+    class_priority : classes in the given priority order (names or ids), nearest first within a class
+"""
+
+import numpy as np
+import inverse_kinematics_calculations as iv
+
+POLICIES = ('nearest', 'joint_travel', 'class_priority')
+
+# Object height on the table in the arm plane: -20 + 2.8 - 1
+TABLE_Y = -16.2
+# Release point (X, Y, Z) every pick cycle ends at
+RELEASE_POINT = (10, -18, 27)
+
+# Joint angles (base, f1, f2, f23) and reachable mask of every target on the table
+# With a workspace_grid.WorkspaceGrid, unreachable targets are filtered by grid lookup first
+def target_joint_angles(targets, table_y=TABLE_Y, grid=None):
+    if grid is not None and grid.table_y == table_y:
+        return grid.solve(targets['robot_x'], targets['robot_z'])
+    return iv.calculate_all_angles_batch(targets['robot_x'], table_y, targets['robot_z'])
+
+"""
+    Plan the pick order of all targets in one call.
+
+    :param targets: structured array with robot_x, robot_z, class_id and name fields
+    :param policy: one of POLICIES
+    :param origin: (X, Z) reference point of the nearest policy
+    :param start_angles: joint angles the joint_travel policy measures from, the release point when omitted
+    :param class_priority: class names or ids, highest priority first; unlisted classes come last
+    :param grid: optional workspace_grid.WorkspaceGrid used to filter unreachable targets
+    :return: array of target indices in pick order and array of indices of unreachable targets
+"""
+def schedule_targets(targets, policy='nearest', origin=(0.0, 0.0), start_angles=None,
+                     class_priority=None, table_y=TABLE_Y, grid=None):
+    if policy not in POLICIES:
+        raise ValueError(f"Invalid policy: {policy}, expected one of {POLICIES}")
+
+    angles, reachable = target_joint_angles(targets, table_y, grid)
+    distance = np.hypot(targets['robot_x'] - origin[0], targets['robot_z'] - origin[1])
+
+    if policy == 'nearest':
+        keys = (distance,)
+    elif policy == 'joint_travel':
+        if start_angles is None:
+            start_angles = iv.calculate_all_angles(*RELEASE_POINT)
+        keys = (np.nansum(np.abs(angles - np.asarray(start_angles, dtype=float)), axis=-1),)
+    else:
+        ranks = {key: rank for rank, key in enumerate(class_priority or [])}
+        rank = np.array([ranks.get(str(name), ranks.get(int(class_id), len(ranks)))
+                         for name, class_id in zip(targets['name'], targets['class_id'])], dtype=int)
+        keys = (distance, rank)
+
+    # np.lexsort sorts by the last key first
+    order = np.lexsort(keys)
+    return order[reachable[order]], np.flatnonzero(~reachable)
+
+# Index of the next target to pick, or None when nothing reachable was detected
+def select_target(targets, policy='nearest', **options):
+    order, _ = schedule_targets(targets, policy, **options)
+    return int(order[0]) if len(order) else None
@@ -0,0 +1,35 @@
+import threading
+import numpy as np
+import tracking
+
+class InterruptedGate(tracking.FrameGate):
+    """Gate whose execute thread calls reset() while changed() is comparing frames."""
+
+    def block_difference(self, small, reference):
+        self.resetter = threading.Thread(target=self.reset)
+        self.resetter.start()
+        self.resetter.join(0.05)
+        return super().block_difference(small, reference)
+
+def test_frame_gate_reset_during_changed():
+    gate = InterruptedGate()
+    tray = np.full((480, 640, 3), 100, np.uint8)
+    brick = tray.copy()
+    brick[200:228, 300:328] += 40
+    assert gate.changed(tray)
+    assert gate.changed(brick)
+    gate.resetter.join()
+    # The reset waits for the comparison instead of being overwritten by the new reference
+    assert gate.reference is None
+    assert gate.changed(brick)
+
+def test_frame_gate_sees_small_brick():
+    gate = tracking.FrameGate()
+    tray = np.full((480, 640, 3), 100, np.uint8)
+    assert gate.changed(tray)
+    assert not gate.changed(tray)
+    brick = tray.copy()
+    brick[200:228, 300:328] += 15
+    assert gate.changed(brick)
+    gate.reset()
+    assert gate.changed(brick)
@@ -0,0 +1,192 @@
+"""
+Tracking of LEGO bricks across frames.
+
+Bricks that are not picked do not move, so their coordinates and joint angles do not need to be
+computed again on every frame.
+
+Tracker matches each new detection to a track of the previous frames with the same class, by IoU
+or, for small boxes, by center distance. When the matched box has moved less than move_tolerance
+pixels, the cached real/robot coordinates and IK solution of the track are reused. Only new and
+moved bricks go through coordinate_conversion.convert_detections and the IK solver. Tracks that
+were not seen for more than max_missed frames are dropped.
+
+FrameGate compares a downsampled grayscale copy of each frame with the frame the detector last ran
+on, block by block, so detection can be skipped entirely while the tray has not changed. The
+largest block mean is used rather than the mean of the whole frame, which a single small brick
+barely moves.
+"""
+
+import itertools
+import threading
+import numpy as np
+import coordinate_conversion as cc
+import plane_calibration as pc
+import target_scheduler as ts
+
+DEFAULT_IOU_THRESHOLD = 0.5
+DEFAULT_CENTER_DISTANCE = 10.0     # pixels
+DEFAULT_MOVE_TOLERANCE = 2.0       # pixels
+DEFAULT_MAX_MISSED = 3
+
+# Boxes of a detection batch as an (N, 4) array of x1, y1, x2, y2
+def boxes_of(detections):
+    return np.stack([detections[key] for key in ('x1', 'y1', 'x2', 'y2')], axis=-1).astype(float)
+
+# Intersection over union of every box in a (N, 4) with every box in b (M, 4)
+def iou_matrix(a, b):
+    a = a[:, np.newaxis, :]
+    b = b[np.newaxis, :, :]
+    w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = w * h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+class Tracker:
+    """Tracks with cached targets (coordinate_conversion.TARGET_DTYPE) and joint angles."""
+
+    def __init__(self, calibration=None, iou_threshold=DEFAULT_IOU_THRESHOLD, center_distance=DEFAULT_CENTER_DISTANCE,
+                 move_tolerance=DEFAULT_MOVE_TOLERANCE, max_missed=DEFAULT_MAX_MISSED, table_y=ts.TABLE_Y, grid=None):
+        self.calibration = pc.default_calibration() if calibration is None else calibration
+        self.iou_threshold = iou_threshold
+        self.center_distance = center_distance
+        self.move_tolerance = move_tolerance
+        self.max_missed = max_missed
+        self.table_y = table_y
+        self.grid = grid
+        self.stats = {'frames': 0, 'reused': 0, 'recomputed': 0}
+        self._next_id = itertools.count()
+        self.reset()
+
+    def reset(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.targets = np.zeros(0, dtype=cc.TARGET_DTYPE)
+        self.angles = np.empty((0, 4))
+        self.reachable = np.empty(0, dtype=bool)
+        self.missed = np.empty(0, dtype=np.int64)
+        self._previous = None
+
+    # Same detections as the previous frame (e.g. reused while the FrameGate saw no change)
+    def _repeat(self, n):
+        keep = np.concatenate([np.ones(n, dtype=bool), self.missed[n:] < self.max_missed])
+        self.missed[n:] += 1
+        for name in ('ids', 'targets', 'angles', 'reachable', 'missed'):
+            setattr(self, name, getattr(self, name)[keep])
+        self.stats['frames'] += 1
+        self.stats['reused'] += n
+        return self.targets[:n].copy(), (self.angles[:n].copy(), self.reachable[:n].copy()), self.ids[:n].copy()
+
+    # Track index matched to each detection, -1 for new bricks; greedy, best IoU then nearest center first
+    def match(self, detections):
+        match = np.full(len(detections), -1, dtype=np.int64)
+        if not len(detections) or not len(self.ids):
+            return match
+        new_boxes = boxes_of(detections)
+        old_boxes = boxes_of(self.targets)
+        iou = iou_matrix(new_boxes, old_boxes)
+        new_centers = (new_boxes[:, :2] + new_boxes[:, 2:]) / 2
+        old_centers = (old_boxes[:, :2] + old_boxes[:, 2:]) / 2
+        distance = np.linalg.norm(new_centers[:, np.newaxis] - old_centers[np.newaxis], axis=-1)
+        same_class = detections['class_id'][:, np.newaxis] == self.targets['class_id'][np.newaxis]
+        candidate = same_class & ((iou >= self.iou_threshold) | (distance <= self.center_distance))
+
+        rows, cols = np.nonzero(candidate)
+        used = np.zeros(len(self.ids), dtype=bool)
+        for k in np.lexsort((distance[rows, cols], -iou[rows, cols])):
+            i, j = rows[k], cols[k]
+            if match[i] < 0 and not used[j]:
+                match[i] = j
+                used[j] = True
+        return match
+
+    """
+        Update the tracks with the detections of a new frame.
+
+        :param detections: detection batch (detection_batch.DETECTION_DTYPE)
+        :return: targets (TARGET_DTYPE, one row per detection), (joint angles (N, 4), reachable mask)
+                 in the form of target_scheduler.target_joint_angles, and the track id of every detection
+    """
+    def update(self, detections):
+        n = len(detections)
+        if self._previous is not None and len(self._previous) == n and np.all(self._previous == detections):
+            return self._repeat(n)
+        self._previous = detections.copy()
+        match = self.match(detections)
+        matched = match >= 0
+        stable = matched.copy()
+        if np.any(matched):
+            moved = np.abs(boxes_of(detections[matched]) - boxes_of(self.targets[match[matched]])).max(axis=-1)
+            stable[matched] = moved <= self.move_tolerance
+
+        targets = np.zeros(n, dtype=cc.TARGET_DTYPE)
+        angles = np.full((n, 4), np.nan)
+        reachable = np.zeros(n, dtype=bool)
+        targets[stable] = self.targets[match[stable]]
+        angles[stable] = self.angles[match[stable]]
+        reachable[stable] = self.reachable[match[stable]]
+
+        fresh = ~stable
+        if np.any(fresh):
+            targets[fresh] = cc.convert_detections(detections[fresh], self.calibration)
+            angles[fresh], reachable[fresh] = ts.target_joint_angles(targets[fresh], self.table_y, self.grid)
+
+        ids = np.empty(n, dtype=np.int64)
+        ids[matched] = self.ids[match[matched]]
+        ids[~matched] = [next(self._next_id) for _ in range(int(np.sum(~matched)))]
+
+        # Keep unmatched tracks for a few frames in case the detector missed them
+        lost = np.ones(len(self.ids), dtype=bool)
+        lost[match[matched]] = False
+        keep = lost & (self.missed < self.max_missed)
+        self.ids = np.concatenate([ids, self.ids[keep]])
+        self.targets = np.concatenate([targets, self.targets[keep]])
+        self.angles = np.concatenate([angles, self.angles[keep]])
+        self.reachable = np.concatenate([reachable, self.reachable[keep]])
+        self.missed = np.concatenate([np.zeros(n, dtype=np.int64), self.missed[keep] + 1])
+
+        self.stats['frames'] += 1
+        self.stats['reused'] += int(np.sum(stable))
+        self.stats['recomputed'] += int(np.sum(fresh))
+        return targets, (angles, reachable), ids
+
+class FrameGate:
+    """Tells whether a frame differs from the last frame detection ran on."""
+
+    def __init__(self, threshold=3.0, scale=8, block=4):
+        self.threshold = threshold      # mean absolute gray-level difference of the most changed block
+        self.scale = scale              # keep every scale-th pixel in both directions
+        self.block = block              # block size in downsampled pixels (block * scale frame pixels)
+        self.reference = None
+        self.stats = {'frames': 0, 'changed': 0}
+        self._lock = threading.Lock()   # reset() is called from the execute thread of pipeline.py
+
+    def _small(self, frame):
+        small = np.asarray(frame)[::self.scale, ::self.scale].astype(np.float32)
+        return small.mean(axis=-1) if small.ndim == 3 else small
+
+    # Mean absolute difference of every block of two downsampled frames
+    def block_difference(self, small, reference):
+        diff = np.abs(small - reference)
+        rows = np.arange(0, diff.shape[0], self.block)
+        cols = np.arange(0, diff.shape[1], self.block)
+        sums = np.add.reduceat(np.add.reduceat(diff, rows, axis=0), cols, axis=1)
+        sizes = np.outer(np.diff(np.append(rows, diff.shape[0])), np.diff(np.append(cols, diff.shape[1])))
+        return sums / sizes
+
+    # True when the frame should be detected again; the frame then becomes the new reference
+    def changed(self, frame):
+        small = self._small(frame)
+        with self._lock:
+            self.stats['frames'] += 1
+            if self.reference is None or self.reference.shape != small.shape \
+                    or self.block_difference(small, self.reference).max() > self.threshold:
+                self.reference = small
+                self.stats['changed'] += 1
+                return True
+            return False
+
+    def reset(self):
+        with self._lock:
+            self.reference = None
@@ -0,0 +1,150 @@
+"""
+Time-parameterized joint trajectories for the robotic arm.
+
+Generates waypoints for all joints at once as a NumPy array, sampled at a fixed step rate,
+so the controller can stream them without a busy loop and the motion time is known in advance.
+
+Profiles (normalized position s(tau) for tau in [0, 1]):
+    linear      : constant velocity
+    trapezoidal : constant acceleration, cruise, constant deceleration
+    s_curve     : quintic (minimum jerk) blend, smooth velocity and acceleration
+
+Each joint's duration is the shortest one that keeps its peak velocity within max_velocity.
+Synchronized moves stretch every joint to the slowest joint's duration so all arrive together;
+staged moves run groups of joints one after another where collision safety needs an order.
+"""
+
+import numpy as np
+
+PROFILES = ('linear', 'trapezoidal', 's_curve')
+
+DEFAULT_STEP_RATE = 50.0        # waypoints per second
+DEFAULT_MAX_VELOCITY = 60.0     # PWM units per second
+DEFAULT_ACCELERATION_FRACTION = 0.25
+
+# Ratio of peak velocity to mean velocity for a profile
+def peak_velocity_factor(profile, acceleration_fraction=DEFAULT_ACCELERATION_FRACTION):
+    if profile == 'linear':
+        return 1.0
+    if profile == 'trapezoidal':
+        return 1.0 / (1.0 - acceleration_fraction)
+    if profile == 's_curve':
+        return 1.875
+    raise ValueError(f"Invalid profile: {profile}, expected one of {PROFILES}")
+
+# Normalized position s(tau) of a profile, tau is clipped to [0, 1]
+def profile_position(profile, tau, acceleration_fraction=DEFAULT_ACCELERATION_FRACTION):
+    tau = np.clip(np.asarray(tau, dtype=float), 0.0, 1.0)
+    if profile == 'linear':
+        return tau
+    if profile == 'trapezoidal':
+        f = acceleration_fraction
+        if not 0 < f <= 0.5:
+            raise ValueError(f"acceleration_fraction must be in (0, 0.5], got {f}")
+        scale = 1.0 / (2 * f * (1 - f))
+        return np.where(tau < f, tau * tau * scale,
+               np.where(tau > 1 - f, 1 - (1 - tau) ** 2 * scale, (tau - f / 2) / (1 - f)))
+    if profile == 's_curve':
+        return tau ** 3 * (10 - 15 * tau + 6 * tau * tau)
+    raise ValueError(f"Invalid profile: {profile}, expected one of {PROFILES}")
+
+"""
+    Shortest duration of each joint's move that respects its velocity limit.
+
+    :param start: start position of each joint
+    :param goal: goal position of each joint
+    :param profile: one of PROFILES
+    :param max_velocity: scalar or per-joint velocity limit (units per second)
+    :return: array of durations in seconds
+"""
+def joint_durations(start, goal, profile='trapezoidal', max_velocity=DEFAULT_MAX_VELOCITY,
+                    acceleration_fraction=DEFAULT_ACCELERATION_FRACTION):
+    distance = np.abs(np.asarray(goal, dtype=float) - np.asarray(start, dtype=float))
+    max_velocity = np.broadcast_to(np.asarray(max_velocity, dtype=float), distance.shape)
+    if np.any(max_velocity <= 0):
+        raise ValueError("max_velocity must be positive")
+    return distance * peak_velocity_factor(profile, acceleration_fraction) / max_velocity
+
+"""
+    Generate waypoints that move every joint from start to goal.
+
+    Joints that finish early hold their goal position until the slowest joint arrives.
+
+    :param start: start position of each joint
+    :param goal: goal position of each joint
+    :param profile: one of PROFILES
+    :param step_rate: waypoints per second
+    :param max_velocity: scalar or per-joint velocity limit (units per second)
+    :return: times (T,) and waypoints (T, number of joints); the first row is start, the last is goal
+"""
+def generate_trajectory(start, goal, profile='trapezoidal', step_rate=DEFAULT_STEP_RATE,
+                        max_velocity=DEFAULT_MAX_VELOCITY,
+                        acceleration_fraction=DEFAULT_ACCELERATION_FRACTION):
+    start = np.atleast_1d(np.asarray(start, dtype=float))
+    goal = np.atleast_1d(np.asarray(goal, dtype=float))
+    if start.shape != goal.shape:
+        raise ValueError(f"start and goal shapes differ: {start.shape} != {goal.shape}")
+    if step_rate <= 0:
+        raise ValueError("step_rate must be positive")
+
+    durations = joint_durations(start, goal, profile, max_velocity, acceleration_fraction)
+    return sample_trajectory(start, goal, durations, profile, step_rate, acceleration_fraction)
+
+# Sample a move whose per-joint durations are already known
+def sample_trajectory(start, goal, durations, profile='trapezoidal', step_rate=DEFAULT_STEP_RATE,
+                      acceleration_fraction=DEFAULT_ACCELERATION_FRACTION):
+    total = float(np.max(durations, initial=0.0))
+    steps = max(int(np.ceil(total * step_rate)), 1)
+    times = np.linspace(0.0, steps / step_rate, steps + 1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tau = np.where(durations > 0, times[:, np.newaxis] / durations, 1.0)
+    s = profile_position(profile, tau, acceleration_fraction)
+    waypoints = start + (goal - start) * s
+    return times, waypoints
+
+"""
+    Generate waypoints for a coordinated move in which all joints arrive at the same time.
+
+    The move takes as long as the slowest joint needs, instead of the sum of the individual
+    joint travels. Joints can optionally be split into stages that run one after another.
+
+    :param start: start position of each joint
+    :param goal: goal position of each joint
+    :param stages: optional list of groups of joint indices moved in order, e.g. [[4], [0, 1, 2, 3]];
+                   joints not listed in any stage move together in a final stage
+    :return: times (T,) and waypoints (T, number of joints)
+"""
+def generate_synchronized_trajectory(start, goal, stages=None, profile='trapezoidal',
+                                     step_rate=DEFAULT_STEP_RATE, max_velocity=DEFAULT_MAX_VELOCITY,
+                                     acceleration_fraction=DEFAULT_ACCELERATION_FRACTION):
+    start = np.atleast_1d(np.asarray(start, dtype=float))
+    goal = np.atleast_1d(np.asarray(goal, dtype=float))
+    if start.shape != goal.shape:
+        raise ValueError(f"start and goal shapes differ: {start.shape} != {goal.shape}")
+    if step_rate <= 0:
+        raise ValueError("step_rate must be positive")
+    durations = joint_durations(start, goal, profile, max_velocity, acceleration_fraction)
+
+    stages = [list(stage) for stage in (stages or [])]
+    listed = {joint for stage in stages for joint in stage}
+    if len(listed) != sum(len(stage) for stage in stages):
+        raise ValueError("A joint appears in more than one stage")
+    remaining = [joint for joint in range(len(start)) if joint not in listed]
+    if remaining:
+        stages.append(remaining)
+
+    times = np.zeros(1)
+    waypoints = start[np.newaxis, :].copy()
+    for stage in stages:
+        stage_goal = waypoints[-1].copy()
+        stage_goal[stage] = goal[stage]
+        stage_durations = np.zeros_like(durations)
+        stage_durations[stage] = np.max(durations[stage])
+        if not np.any(stage_durations > 0):
+            continue
+        stage_times, stage_waypoints = sample_trajectory(waypoints[-1], stage_goal, stage_durations,
+                                                         profile, step_rate, acceleration_fraction)
+        times = np.concatenate([times, times[-1] + stage_times[1:]])
+        waypoints = np.concatenate([waypoints, stage_waypoints[1:]])
+    return times, waypoints
@@ -0,0 +1,140 @@
+"""
+Precomputed reachability and joint-angle grid over the table plane.
+
+The grid samples the robot (X, Z) table plane at the table height (target_scheduler.TABLE_Y) and
+stores the joint angles (base, f1, f2, f23) of every cell, NaN where the arm cannot reach. It is
+built once with the batch IK, saved as a .npy file plus a small .json header, and opened
+memory-mapped on later starts.
+
+    is_reachable : O(1) check per target, no exceptions from math.acos or division by zero
+    interpolate  : bilinear joint angles from the four surrounding cells (warm start)
+    solve        : interpolated angles refined with the exact IK solver where they are reachable
+
+A point counts as reachable only when all four surrounding cells are, so the check is conservative
+at the edge of the workspace by at most one cell.
+"""
+
+import json
+import numpy as np
+import inverse_kinematics_calculations as iv
+import target_scheduler as ts
+
+GRID_PATH = 'workspace_grid.npy'
+
+# Table area covered by the camera, in robot coordinates (cm)
+DEFAULT_X_RANGE = (0.0, 50.0)
+DEFAULT_Z_RANGE = (-35.0, 35.0)
+DEFAULT_STEP = 0.25
+
+# Header file stored next to the .npy grid
+def _header_path(file_path):
+    return file_path[:-4] + '.json' if file_path.endswith('.npy') else file_path + '.json'
+
+class WorkspaceGrid:
+    """Joint angles of a regular (X, Z) grid; angles[i, j] belongs to (x0 + i * step, z0 + j * step)."""
+
+    def __init__(self, angles, x0, z0, step, table_y=ts.TABLE_Y):
+        self.angles = angles
+        self.x0 = float(x0)
+        self.z0 = float(z0)
+        self.step = float(step)
+        self.table_y = float(table_y)
+        self.reachable = ~np.isnan(angles[..., 0])
+
+    """
+        Solve every cell of the grid with the batch IK.
+
+        :param x_range: (min, max) robot X of the grid (cm)
+        :param z_range: (min, max) robot Z of the grid (cm)
+        :param step: cell size (cm)
+        :param table_y: height of the plane in the arm's coordinates
+        :param file_path: when given, the angles are written straight into a .npy file and memory-mapped
+    """
+    @classmethod
+    def build(cls, x_range=DEFAULT_X_RANGE, z_range=DEFAULT_Z_RANGE, step=DEFAULT_STEP, table_y=ts.TABLE_Y,
+              file_path=None):
+        xs = np.arange(x_range[0], x_range[1] + step / 2, step)
+        zs = np.arange(z_range[0], z_range[1] + step / 2, step)
+        shape = (len(xs), len(zs), 4)
+        if file_path is None:
+            angles = np.empty(shape, dtype=np.float32)
+        else:
+            angles = np.lib.format.open_memmap(file_path, mode='w+', dtype=np.float32, shape=shape)
+
+        # One row of X at a time keeps the temporary arrays small
+        for i, x in enumerate(xs):
+            angles[i] = iv.calculate_all_angles_batch(x, table_y, zs)[0]
+
+        grid = cls(angles, xs[0], zs[0], step, table_y)
+        if file_path is not None:
+            angles.flush()
+            grid._write_header(file_path)
+        return grid
+
+    def _write_header(self, file_path):
+        with open(_header_path(file_path), 'w') as f:
+            json.dump({'x0': self.x0, 'z0': self.z0, 'step': self.step, 'table_y': self.table_y,
+                       'links': [iv.L1, iv.L2, iv.L3]}, f, indent=2)
+
+    def save(self, file_path=GRID_PATH):
+        np.save(file_path, np.asarray(self.angles))
+        self._write_header(file_path)
+
+    # Open a saved grid memory-mapped; raises ValueError when it was built for other link lengths
+    @classmethod
+    def load(cls, file_path=GRID_PATH, mmap_mode='r'):
+        with open(_header_path(file_path), 'r') as f:
+            header = json.load(f)
+        if header['links'] != [iv.L1, iv.L2, iv.L3]:
+            raise ValueError(f"{file_path} was built for links {header['links']}")
+        angles = np.load(file_path, mmap_mode=mmap_mode)
+        return cls(angles, header['x0'], header['z0'], header['step'], header['table_y'])
+
+    # Lower cell index and fractional position of each point; inside is False outside the grid
+    def _cells(self, X, Z):
+        fx = (np.atleast_1d(np.asarray(X, dtype=float)) - self.x0) / self.step
+        fz = (np.atleast_1d(np.asarray(Z, dtype=float)) - self.z0) / self.step
+        nx, nz = self.reachable.shape
+        inside = (fx >= 0) & (fx <= nx - 1) & (fz >= 0) & (fz <= nz - 1)
+        i = np.clip(np.floor(fx), 0, nx - 2).astype(int)
+        j = np.clip(np.floor(fz), 0, nz - 2).astype(int)
+        return i, j, fx - i, fz - j, inside
+
+    # True where the target (X, Z) on the table can be reached
+    def is_reachable(self, X, Z):
+        i, j, _, _, inside = self._cells(X, Z)
+        r = self.reachable
+        return inside & r[i, j] & r[i + 1, j] & r[i, j + 1] & r[i + 1, j + 1]
+
+    # Bilinear joint angles (N, 4), NaN where the target is not reachable
+    def interpolate(self, X, Z):
+        i, j, u, v, _ = self._cells(X, Z)
+        u = u[..., np.newaxis]
+        v = v[..., np.newaxis]
+        a = self.angles
+        angles = ((1 - u) * (1 - v) * a[i, j] + u * (1 - v) * a[i + 1, j]
+                  + (1 - u) * v * a[i, j + 1] + u * v * a[i + 1, j + 1])
+        reachable = self.is_reachable(X, Z)
+        return np.where(reachable[..., np.newaxis], angles, np.nan), reachable
+
+    # Joint angles (N, 4) and reachable mask; the exact solver only runs on reachable targets
+    def solve(self, X, Z, refine=True):
+        angles, reachable = self.interpolate(X, Z)
+        if refine and np.any(reachable):
+            X, Z = np.broadcast_arrays(np.atleast_1d(np.asarray(X, dtype=float)), np.atleast_1d(np.asarray(Z, dtype=float)))
+            exact, ok = iv.calculate_all_angles_batch(X[reachable], self.table_y, Z[reachable])
+            angles[reachable] = exact
+            reachable = reachable.copy()
+            reachable[reachable] = ok
+        return angles, reachable
+
+    # Mask of converted detections (robot_x, robot_z fields) that can be picked
+    def reachable_targets(self, targets):
+        return self.is_reachable(targets['robot_x'], targets['robot_z'])
+
+# Open the saved grid, or build and save it when there is none or it is out of date
+def load_or_build(file_path=GRID_PATH, **options):
+    try:
+        return WorkspaceGrid.load(file_path)
+    except (FileNotFoundError, ValueError, KeyError):
+        return WorkspaceGrid.build(file_path=file_path, **options)